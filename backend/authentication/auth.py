@@ -1,12 +1,20 @@
 from passlib.context import CryptContext
-from config import ACCESS_TOKEN_EXPIRE_MINUTES,ALGORITHM,SECRET_KEY
+from config import ACCESS_TOKEN_EXPIRE_MINUTES,ALGORITHM,SECRET_KEY,BCRYPT_ROUNDS,HASH_MAX_CONCURRENCY
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from jose import jwt,JWTError
+import asyncio
 
 
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated='auto')
+# min_rounds makes hashes created with a lower cost report as needing an update
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated='auto',
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS
+)
 
 def password_hash(password):
     return pwd_context.hash(password)
@@ -14,9 +22,58 @@ def password_hash(password):
 def verify_password(plain_password,hashed_password):
     return pwd_context.verify(plain_password,hashed_password)
 
+
+class HashingService:
+    """Runs bcrypt on a bounded thread pool so it never blocks the event loop"""
+
+    def __init__(self, max_concurrency):
+        self.max_concurrency = max_concurrency
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="bcrypt")
+        self._semaphore = None
+        self.waiting = 0
+        self.running = 0
+
+    def _get_semaphore(self):
+        # Created lazily so it binds to the running loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def _run(self, fn, *args):
+        self.waiting += 1
+        try:
+            await self._get_semaphore().acquire()
+        finally:
+            self.waiting -= 1
+
+        self.running += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, fn, *args)
+        finally:
+            self.running -= 1
+            self._get_semaphore().release()
+
+    async def hash(self, password):
+        return await self._run(password_hash, password)
+
+    async def verify_and_update(self, plain_password, hashed_password):
+        """Returns (valid, new_hash); new_hash is set when the stored hash uses outdated cost settings"""
+        return await self._run(pwd_context.verify_and_update, plain_password, hashed_password)
+
+    def stats(self):
+        return {
+            "max_concurrency": self.max_concurrency,
+            "running": self.running,
+            "queue_depth": self.waiting
+        }
+
+
+hashing_service = HashingService(HASH_MAX_CONCURRENCY)
+
 def create_access_token(data:dict,expires_delta:timedelta = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)):
     to_encode = data.copy()
     expires = datetime.utcnow() + expires_delta
     to_encode.update({'exp':expires})
     encoded_jwt = jwt.encode(to_encode,SECRET_KEY,algorithm=ALGORITHM)
-    return encoded_jwt
\ No newline at end of file
+    return encoded_jwt
@@ -1,11 +1,13 @@
 from fastapi import Depends, HTTPException,status,APIRouter
 from .schema import User,UserInDB,Login
-from .auth import password_hash,verify_password,create_access_token
+from .auth import hashing_service,create_access_token
 from database import get_db
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt,JWTError
-from config import SECRET_KEY,ALGORITHM
+from config import SECRET_KEY,ALGORITHM,JWT_EMBED_USER_CLAIMS
 from utils.serializer import serialize_document
+from defendecies import user_cache_stats,invalidate_user
+from internal import router as internal_router
 
 
 
@@ -24,7 +26,7 @@ async def register_user(user:User):
         if  existing_user:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,detail="User already exist!")
         
-        user_dict["hashed_password"] = password_hash(user.password)
+        user_dict["hashed_password"] = await hashing_service.hash(user.password)
         del user_dict["password"]
         
 
@@ -45,10 +47,20 @@ async def login (user:Login):
         if not user_in_db:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credential")
         
-        if not verify_password(user.password,user_in_db["hashed_password"]):
+        valid, new_hash = await hashing_service.verify_and_update(user.password,user_in_db["hashed_password"])
+        if not valid:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,detail="Invalid credential")
-        
-        token = create_access_token(data={"sub":user_in_db["email"]})
+
+        # Transparently upgrade hashes created with older cost settings
+        if new_hash:
+            await db.users.update_one({"_id":user_in_db["_id"]},{"$set":{"hashed_password":new_hash}})
+            invalidate_user(email=user_in_db["email"])
+
+        claims = {"sub":user_in_db["email"]}
+        if JWT_EMBED_USER_CLAIMS:
+            claims.update({"uid":str(user_in_db["_id"]),"username":user_in_db.get("username")})
+
+        token = create_access_token(data=claims)
         return token
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Error:{str(e)}")
@@ -76,4 +88,11 @@ async def get_user_profile(token:str=Depends(oauth2_scheme)):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,detail=f"Error:{str(e)}")
 
 
+@internal_router.get("/auth/user-cache")
+async def get_user_cache_stats():
+    return user_cache_stats()
+
 
+@internal_router.get("/auth/hashing")
+async def get_hashing_stats():
+    return hashing_service.stats()
@@ -0,0 +1,107 @@
+"""
+Report latency of the columnar analytics engine vs the Mongo aggregation paths, run from the backend directory:
+
+    python -m benchmarks.analytics --rows 100000 --user-id bench-analytics
+    python -m benchmarks.analytics --user-id bench-analytics --no-seed
+
+Seeds one user with --rows transactions over ten years and rebuilds their
+rollups. It then times a yearly report (totals, categories, monthly) and the
+AI rollup rows, through report_pipeline on raw transactions, report_pipeline
+on rollups, and the engine. The engine's one-off load is reported on its own.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from database import get_db
+from predictions.insights import load_rollup_rows
+from summary import report_pipeline
+from summary.analytics import AnalyticsEngine
+from summary.rollups import rebuild_rollups
+from utils.date_window import year_window
+from .common import EXPENSES, summarize
+
+SECTIONS = ["totals", "categories", "monthly"]
+
+
+async def seed(db, user_id, rows, chunk=10000):
+    await db.transactions.delete_many({"user_id": user_id})
+    rng = random.Random(7)
+    start = datetime(2016, 1, 1)
+    categories = list(EXPENSES)
+    for offset in range(0, rows, chunk):
+        batch = []
+        for _ in range(min(chunk, rows - offset)):
+            income = rng.random() < 0.08
+            batch.append({
+                "user_id": user_id,
+                "amount": round(rng.uniform(1500, 5000) if income else rng.uniform(2, 250), 2),
+                "type": "income" if income else "expense",
+                "category": "Income" if income else rng.choice(categories),
+                "description": "bench row",
+                "date": start + timedelta(minutes=rng.randint(0, 60 * 24 * 3650))
+            })
+        await db.transactions.insert_many(batch, ordered=False)
+    await rebuild_rollups(db, user_id)
+
+
+async def timed(coroutine_factory, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await coroutine_factory()
+        samples.append((time.perf_counter() - start) * 1000)
+    return summarize(samples)
+
+
+async def run(args):
+    db = get_db()
+    if not args.no_seed:
+        await seed(db, args.user_id, args.rows)
+
+    start, end = year_window(args.year)
+    engine = AnalyticsEngine(memory_budget_bytes=1 << 30, max_age_seconds=3600)
+
+    load_start = time.perf_counter()
+    columns = await engine.columns(db, args.user_id)
+    load_ms = (time.perf_counter() - load_start) * 1000
+
+    async def engine_report():
+        return (await engine.columns(db, args.user_id)).facets(start, end, SECTIONS)
+
+    async def engine_rows():
+        return (await engine.columns(db, args.user_id)).rollup_rows()
+
+    results = {
+        "rows": columns.size,
+        "engine_load_ms": round(load_ms, 2),
+        "engine_bytes": columns.nbytes,
+        "yearly_report": {
+            "transactions_pipeline": await timed(
+                lambda: report_pipeline.run_report(db, args.user_id, start, end, SECTIONS, "transactions"), args.repeat),
+            "rollups_pipeline": await timed(
+                lambda: report_pipeline.run_report(db, args.user_id, start, end, SECTIONS, "rollups"), args.repeat),
+            "engine": await timed(engine_report, args.repeat)
+        },
+        "ai_rollup_rows": {
+            "rollups_find": await timed(lambda: load_rollup_rows(db, args.user_id), args.repeat),
+            "engine": await timed(engine_rows, args.repeat)
+        }
+    }
+    print(json.dumps(results, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--user-id", default="bench-analytics")
+    parser.add_argument("--year", default="2020")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--no-seed", action="store_true", help="reuse rows from an earlier run")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
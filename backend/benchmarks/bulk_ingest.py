@@ -0,0 +1,67 @@
+"""
+Rows per second through POST /add (one row per call) vs POST /transactions/bulk,
+against a running server:
+
+    python benchmarks/bulk_ingest.py --token <jwt> --rows 2000
+
+Rows are sent without a category so both paths exercise auto-categorisation.
+"""
+import argparse
+import json
+import random
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+DESCRIPTIONS = ["Starbucks coffee", "Uber ride", "Domino's Pizza", "Netflix", "Grocery store", "Bus ticket"]
+
+
+def post(base_url, path, token, body):
+    req = urllib.request.Request(
+        base_url + path,
+        data=json.dumps(body).encode(),
+        method="POST",
+        headers={"Content-Type": "application/json", "Authorization": f"Bearer {token}"}
+    )
+    with urllib.request.urlopen(req, timeout=600) as response:
+        return json.loads(response.read())
+
+
+def make_rows(count):
+    return [{
+        "amount": round(random.uniform(1, 200), 2),
+        "type": "expense",
+        "description": random.choice(DESCRIPTIONS)
+    } for _ in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--token", required=True)
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--clients", type=int, default=8, help="concurrent callers for the single-add path")
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clients) as pool:
+        list(pool.map(lambda row: post(args.base_url, "/add", args.token, row), rows))
+    single = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = post(args.base_url, "/transactions/bulk", args.token, rows)
+    bulk = time.perf_counter() - start
+
+    print(json.dumps({
+        "rows": args.rows,
+        "single_add_rows_per_sec": round(args.rows / single, 1),
+        "bulk_rows_per_sec": round(args.rows / bulk, 1),
+        "bulk_inserted": result.get("inserted"),
+        "bulk_failed": result.get("failed")
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
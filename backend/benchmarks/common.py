@@ -0,0 +1,71 @@
+"""
+Helpers shared by the benchmarks: stdlib requests, latency summaries and peak RSS.
+"""
+import json
+import resource
+import sys
+import time
+import urllib.error
+import urllib.request
+
+# Seeded benchmark population (see benchmarks.seed)
+EMAIL = "bench-{}@example.com"
+
+EXPENSES = {
+    "Food & Drink": ["Starbucks coffee", "Domino's Pizza", "Lunch at cafe"],
+    "Groceries": ["Grocery store", "Supermarket run", "Farmers market"],
+    "Travel": ["Uber ride", "Bus ticket", "Train pass"],
+    "Entertainment": ["Netflix", "Cinema tickets", "Concert"],
+    "Shopping": ["Amazon order", "Clothing store", "Electronics"],
+    "Bills": ["Electricity bill", "Internet bill", "Phone bill"],
+}
+
+
+def http_request(base_url, method, path, body=None, token=None, headers=None, timeout=60):
+    """(status, response body, milliseconds); HTTP errors are returned, not raised, and connection errors are status 0"""
+    all_headers = {"Content-Type": "application/json"}
+    if token:
+        all_headers["Authorization"] = f"Bearer {token}"
+    all_headers.update(headers or {})
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(base_url + path, data=data, method=method, headers=all_headers)
+
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            status, content = response.status, response.read()
+    except urllib.error.HTTPError as e:
+        status, content = e.code, e.read()
+    except (urllib.error.URLError, OSError) as e:
+        status, content = 0, str(e).encode()
+    return status, content, (time.perf_counter() - start) * 1000
+
+
+def login(base_url, email, password):
+    status, content, _ = http_request(base_url, "POST", "/login", {"email": email, "password": password})
+    if status != 200:
+        raise RuntimeError(f"Login failed for {email}: {status} {content[:200]!r}")
+    return json.loads(content)
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(latencies):
+    return {
+        "requests": len(latencies),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2)
+    }
+
+
+def peak_rss_mb():
+    """High-water resident memory of this process; ru_maxrss is KiB on Linux and bytes on macOS"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
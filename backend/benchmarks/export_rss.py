@@ -0,0 +1,70 @@
+"""
+Peak RSS of a full-history transaction export, run from the backend directory:
+
+    python -m benchmarks.export_rss --seed 1000000 --user-id bench-export
+    python -m benchmarks.export_rss --mode list --user-id bench-export
+    python -m benchmarks.export_rss --mode stream --user-id bench-export
+
+Run each mode in its own process: ru_maxrss is a high-water mark for the
+whole process. 'list' materialises every row the way the old endpoint did,
+'stream' drains the NDJSON generator used by GET /transactions/?format=ndjson.
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+from database import get_db
+from utils.serializer import serialize_documents
+from transaction.transaction_route import stream_transactions
+from .common import peak_rss_mb
+
+
+async def seed(db, user_id, rows, chunk=10000):
+    categories = ["Food & Drink", "Travel", "Groceries", "Entertainment", "Income"]
+    start = datetime(2015, 1, 1)
+    for offset in range(0, rows, chunk):
+        batch = [{
+            "user_id": user_id,
+            "amount": round(random.uniform(1, 500), 2),
+            "category": random.choice(categories),
+            "type": random.choice(["expense", "expense", "income"]),
+            "description": "bench row",
+            "date": start + timedelta(minutes=random.randint(0, 60 * 24 * 3650))
+        } for _ in range(min(chunk, rows - offset))]
+        await db.transactions.insert_many(batch, ordered=False)
+
+
+async def run(mode, user_id):
+    db = get_db()
+    start = time.perf_counter()
+    size = 0
+    rows = 0
+
+    if mode == "list":
+        transactions = await db.transactions.find({"user_id": user_id}).to_list(None)
+        rows = len(serialize_documents(transactions))
+    else:
+        async for line in stream_transactions(db, {"user_id": user_id}):
+            size += len(line)
+            rows += 1
+
+    elapsed = time.perf_counter() - start
+    print(f"mode={mode} rows={rows} bytes={size} seconds={elapsed:.2f} peak_rss_mb={peak_rss_mb():.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["list", "stream"], default="stream")
+    parser.add_argument("--user-id", default="bench-export")
+    parser.add_argument("--seed", type=int, default=0, help="insert this many synthetic rows and exit")
+    args = parser.parse_args()
+
+    if args.seed:
+        asyncio.run(seed(get_db(), args.user_id, args.seed))
+    else:
+        asyncio.run(run(args.mode, args.user_id))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Forecast latency for long histories, run from the backend directory:
+
+    python -m benchmarks.forecasting --years 10 --categories 20
+
+Builds synthetic monthly expense rollups (trend + seasonality + noise) and
+times predictions.forecasting.forecast, which fits every category at once.
+"""
+import argparse
+import json
+import time
+import numpy as np
+from predictions.forecasting import forecast, index_month
+from .common import percentile
+
+
+START = 2015 * 12
+
+
+def synthetic_rows(years, categories, seed=7):
+    rng = np.random.default_rng(seed)
+    months = years * 12
+    start = START
+    rows = []
+    for c in range(categories):
+        base = rng.uniform(50, 800)
+        trend = rng.uniform(-2, 5)
+        season = rng.uniform(0, 0.3) * base
+        for m in range(months):
+            total = base + trend * m + season * np.sin(2 * np.pi * m / 12) + rng.normal(0, base * 0.1)
+            rows.append({"month": index_month(start + m), "category": f"category-{c}", "total": max(float(total), 0.0)})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--categories", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    rows = synthetic_rows(args.years, args.categories)
+    # Forecast the month right after the synthetic history
+    target = START + args.years * 12
+    forecast(rows, target)
+
+    samples = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        forecast(rows, target)
+        samples.append((time.perf_counter() - start) * 1000)
+
+    print(json.dumps({
+        "months": args.years * 12,
+        "categories": args.categories,
+        "rows": len(rows),
+        "p50_ms": round(percentile(samples, 50), 3),
+        "p99_ms": round(percentile(samples, 99), 3)
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
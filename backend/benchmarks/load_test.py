@@ -0,0 +1,240 @@
+"""
+Mixed-traffic load test over every router, against a running server seeded by benchmarks.seed:
+
+    python -m benchmarks.load_test --users 100 --clients 32 --duration 60 --output baseline.json
+    python -m benchmarks.load_test --mix "dashboard.summary=10,transactions.add=5" --duration 30
+    python -m benchmarks.load_test --output after.json --compare baseline.json
+    python -m benchmarks.load_test --compare baseline.json --against after.json
+
+Each client logs in as one of the seeded bench users and picks endpoints at
+random in proportion to the mix weights. The run writes throughput, error
+counts and p50/p95/p99 per endpoint to --output. With --compare, any
+endpoint whose p95 grows or whose throughput drops by more than --tolerance
+is reported as a regression and the process exits with status 1. --against
+compares two saved result files without running any load.
+
+Requests rejected by admission control (429/503, see utils/admission.py)
+are counted as "shed" and kept out of latency and throughput, which measure
+requests that were actually handled. A run whose shed share exceeds
+--max-shed-rate fails, since its numbers would mostly describe the
+rejection path. To measure raw capacity, start the server with
+ADMISSION_ENABLED=false; to measure shedding itself, raise --max-shed-rate.
+"""
+import argparse
+import json
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from .common import EMAIL, EXPENSES, http_request, login, summarize
+
+
+def this_month():
+    return datetime.utcnow().strftime("%Y-%m")
+
+
+def new_transaction(rng):
+    category = rng.choice(list(EXPENSES))
+    return {"amount": round(rng.uniform(2, 250), 2), "type": "expense", "description": rng.choice(EXPENSES[category])}
+
+
+# name -> (method, path, body factory or None)
+ENDPOINTS = {
+    "auth.login": ("POST", "/login", None),
+    "auth.profile": ("GET", "/profile", None),
+    "transactions.add": ("POST", "/add", new_transaction),
+    "transactions.bulk": ("POST", "/transactions/bulk", lambda rng: [new_transaction(rng) for _ in range(100)]),
+    "transactions.list": ("GET", "/transactions/?limit=50", None),
+    "transactions.filter": ("GET", "/transactions/filter?category=Groceries&limit=50", None),
+    "budget.get": ("GET", lambda: f"/budget/get?month={this_month()}", None),
+    "budget.update": ("PUT", "/budget/update", lambda rng: {"amount": round(rng.uniform(800, 3000), 2), "month": this_month()}),
+    "budget.progress": ("GET", lambda: f"/budget/track-progress?month={this_month()}", None),
+    "budget.progress_year": ("GET", lambda: f"/budget/progress?from={this_month()[:4]}-01&to={this_month()[:4]}-12", None),
+    "dashboard.summary": ("GET", "/dashboard/summary", None),
+    "dashboard.category_wise": ("GET", "/dashboard/category-wise", None),
+    "dashboard.monthly_report": ("GET", "/dashboard/monthly-report", None),
+    "dashboard.yearly_report": ("GET", "/dashboard/yearly-report", None),
+    "dashboard.overview": ("GET", "/dashboard/overview", None),
+    "ai.spending_analysis": ("GET", "/ai/spending-analysis", None),
+    "ai.budget_prediction": ("GET", "/ai/budget-prediction", None),
+    "ai.savings_suggestions": ("GET", "/ai/savings-suggestions", None),
+}
+
+# Admission control rejections; fast by design, so they would skew the latencies
+SHED_STATUSES = {429, 503}
+
+# Read-heavy default, roughly what the web client does on page loads
+DEFAULT_MIX = {
+    "auth.login": 1,
+    "auth.profile": 2,
+    "transactions.add": 8,
+    "transactions.bulk": 1,
+    "transactions.list": 10,
+    "transactions.filter": 4,
+    "budget.get": 4,
+    "budget.update": 1,
+    "budget.progress": 4,
+    "budget.progress_year": 2,
+    "dashboard.summary": 10,
+    "dashboard.category_wise": 6,
+    "dashboard.monthly_report": 6,
+    "dashboard.yearly_report": 3,
+    "dashboard.overview": 6,
+    "ai.spending_analysis": 3,
+    "ai.budget_prediction": 3,
+    "ai.savings_suggestions": 3,
+}
+
+
+def parse_mix(text):
+    if not text:
+        return dict(DEFAULT_MIX)
+    mix = {}
+    for item in text.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise SystemExit(f"Unknown endpoint '{name}'; choose from {', '.join(ENDPOINTS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def call(base_url, name, token, credentials, rng):
+    method, path, body = ENDPOINTS[name]
+    if callable(path):
+        path = path()
+    if name == "auth.login":
+        return http_request(base_url, method, path, credentials)
+    return http_request(base_url, method, path, body(rng) if body else None, token=token)
+
+
+def run_load(args, mix):
+    credentials = [{"email": EMAIL.format(n), "password": args.password} for n in range(args.users)]
+    tokens = [login(args.base_url, **user) for user in credentials[:args.clients]]
+
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    shed = defaultdict(int)
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.duration
+
+    def client(index):
+        rng = random.Random(args.seed + index)
+        user = index % len(tokens)
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            status, _, elapsed = call(args.base_url, name, tokens[user], credentials[user], rng)
+            with lock:
+                if status in SHED_STATUSES:
+                    shed[name] += 1
+                    continue
+                latencies[name].append(elapsed)
+                # 4xx from the API (e.g. no budget yet) still measure the path; only server errors count
+                if status >= 500 or status == 0:
+                    errors[name] += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clients) as pool:
+        list(pool.map(client, range(args.clients)))
+    elapsed = time.perf_counter() - start
+
+    endpoints = {
+        name: {
+            **summarize(latencies[name]), "errors": errors[name], "shed": shed[name],
+            "throughput_rps": round(len(latencies[name]) / elapsed, 2)
+        }
+        for name in sorted(latencies.keys() | shed.keys())
+    }
+    everything = [sample for samples in latencies.values() for sample in samples]
+    total_shed = sum(shed.values())
+    return {
+        "meta": {
+            "started_at": datetime.utcnow().isoformat(),
+            "commit": git_commit(),
+            "base_url": args.base_url,
+            "clients": args.clients,
+            "users": args.users,
+            "duration_seconds": round(elapsed, 2),
+            "mix": mix
+        },
+        "total": {
+            **summarize(everything), "errors": sum(errors.values()), "shed": total_shed,
+            "shed_rate": round(total_shed / max(len(everything) + total_shed, 1), 4),
+            "throughput_rps": round(len(everything) / elapsed, 2)
+        },
+        "endpoints": endpoints
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+
+def compare(baseline, current, tolerance):
+    """Endpoints whose p95 grew or throughput fell by more than `tolerance` (a fraction)"""
+    regressions = []
+    for name, before in baseline["endpoints"].items():
+        after = current["endpoints"].get(name)
+        if not after:
+            continue
+        if before["p95_ms"] and after["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append({"endpoint": name, "metric": "p95_ms", "before": before["p95_ms"], "after": after["p95_ms"]})
+        if before["throughput_rps"] and after["throughput_rps"] < before["throughput_rps"] * (1 - tolerance):
+            regressions.append({"endpoint": name, "metric": "throughput_rps",
+                                "before": before["throughput_rps"], "after": after["throughput_rps"]})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--users", type=int, default=100, help="seeded bench users to log in as")
+    parser.add_argument("--password", default="bench-password")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=60.0)
+    parser.add_argument("--mix", help="comma-separated endpoint=weight pairs; defaults to a read-heavy mix")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="write the results as JSON")
+    parser.add_argument("--compare", help="baseline results to check for regressions")
+    parser.add_argument("--against", help="compare this saved result with --compare instead of running load")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    parser.add_argument("--max-shed-rate", type=float, default=0.01,
+                        help="fail when more than this share of requests got 429/503 from admission control")
+    args = parser.parse_args()
+
+    if args.against:
+        with open(args.against) as f:
+            result = json.load(f)
+    else:
+        result = run_load(args, parse_mix(args.mix))
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(result, f, indent=2)
+        print(json.dumps({"total": result["total"], "endpoints": result["endpoints"]}, indent=2))
+        shed_rate = result["total"]["shed_rate"]
+        if shed_rate > args.max_shed_rate:
+            print(f"{shed_rate:.1%} of requests were shed by admission control (limit {args.max_shed_rate:.1%}); "
+                  "the latencies do not describe normal handling. Run the server with ADMISSION_ENABLED=false "
+                  "or fewer --clients.", file=sys.stderr)
+            sys.exit(1)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, result, args.tolerance)
+        print(json.dumps({"tolerance": args.tolerance, "regressions": regressions}, indent=2))
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Login storm load test.
+
+Measures latency of a non-auth endpoint on its own and then while many
+clients hammer /login, against a running server:
+
+    uvicorn main:app --workers 1
+    python -m benchmarks.login_storm --base-url http://127.0.0.1:8000 --email a@b.com --password secret
+
+With bcrypt on the hashing pool the probe p99 should stay roughly flat.
+"""
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from .common import http_request, summarize
+
+
+def probe(base_url, path, duration):
+    latencies = []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        _, _, elapsed = http_request(base_url, "GET", path)
+        latencies.append(elapsed)
+    return latencies
+
+
+def login_storm(base_url, email, password, clients, stop):
+    def worker():
+        while not stop.is_set():
+            http_request(base_url, "POST", "/login", {"email": email, "password": password})
+
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        for _ in range(clients):
+            pool.submit(worker)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--probe-path", default="/")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+
+    baseline = probe(args.base_url, args.probe_path, args.duration)
+
+    stop = threading.Event()
+    storm = threading.Thread(target=login_storm, args=(args.base_url, args.email, args.password, args.clients, stop))
+    storm.start()
+    try:
+        during_storm = probe(args.base_url, args.probe_path, args.duration)
+    finally:
+        stop.set()
+        storm.join()
+
+    print(json.dumps({"baseline": summarize(baseline), "login_storm": summarize(during_storm)}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
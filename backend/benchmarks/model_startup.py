@@ -0,0 +1,43 @@
+"""
+Startup time and per-worker RSS for the categoriser model, run from the backend directory:
+
+    python -m benchmarks.model_startup
+
+Each measurement runs in a fresh interpreter:
+- import_seconds: time to import main (the model is no longer loaded at import)
+- eager_load_seconds: the old behaviour, joblib.load during import
+- rss_mb: resident memory after the model is loaded, with and without mmap
+"""
+import json
+import subprocess
+import sys
+
+CHILD = r"""
+import json, time
+start = time.perf_counter()
+{body}
+elapsed = time.perf_counter() - start
+from benchmarks.common import peak_rss_mb
+print(json.dumps({{"seconds": elapsed, "rss_mb": peak_rss_mb()}}))
+"""
+
+CASES = {
+    "import_main": "import main",
+    "eager_load": "import joblib; from config import MODEL_PATH; joblib.load(MODEL_PATH)",
+    "registry_load_mmap": "import os; os.environ['MODEL_MMAP'] = 'true'\nfrom transaction.model_registry import model_registry; model_registry.get()",
+    "registry_load_no_mmap": "import os; os.environ['MODEL_MMAP'] = 'false'\nfrom transaction.model_registry import model_registry; model_registry.get()",
+}
+
+
+def run(body):
+    output = subprocess.run([sys.executable, "-c", CHILD.format(body=body)], capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main():
+    results = {name: run(body) for name, body in CASES.items()}
+    print(json.dumps({name: {key: round(value, 4) for key, value in result.items()} for name, result in results.items()}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Cold vs cached latency for the dashboard and AI endpoints, against a running server:
+
+    python -m benchmarks.response_cache --token <jwt> --requests 200
+
+Cold requests send `Cache-Control: no-cache`, which forces a recompute;
+cached requests are plain repeats of the same URL.
+"""
+import argparse
+import json
+from .common import http_request, percentile
+
+ENDPOINTS = [
+    "/dashboard/summary",
+    "/dashboard/category-wise",
+    "/dashboard/monthly-report",
+    "/dashboard/yearly-report",
+    "/ai/spending-analysis",
+    "/ai/savings-suggestions",
+]
+
+
+def timed_get(base_url, path, token, cold):
+    headers = {"Cache-Control": "no-cache"} if cold else {}
+    _, _, elapsed = http_request(base_url, "GET", path, token=token, headers=headers)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--token", required=True)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    results = {}
+    for path in ENDPOINTS:
+        row = {}
+        for label, cold in (("cold", True), ("cached", False)):
+            samples = [timed_get(args.base_url, path, args.token, cold) for _ in range(args.requests)]
+            row[label] = {"p50_ms": round(percentile(samples, 50), 2), "p99_ms": round(percentile(samples, 99), 2)}
+        results[path] = row
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Seed MongoDB with synthetic benchmark users, transactions and budgets, run from the backend directory:
+
+    python -m benchmarks.seed --scale 10k
+    python -m benchmarks.seed --scale 1m --users 1000 --reset
+    python -m benchmarks.seed --scale 10m --users 10000 --reset
+
+Users are bench-<n>@example.com with a shared password (--password). The data
+is reproducible for a given --seed. Transactions are spread over --years of
+history with a per-user category mix, and every user gets a budget for each
+of the last 12 months. Their rollups are rebuilt at the end, so the dashboard and AI
+endpoints see the same data a live system would. --reset removes a previous
+benchmark population first. Point MONGO_URI at a local server or replica set
+(or install a stand-in with database.use_database) before running.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from authentication.auth import pwd_context
+from database import get_db
+from indexes import ensure_indexes
+from summary.rollups import rebuild_rollups
+from .common import EMAIL, EXPENSES
+
+SCALES = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+
+
+async def reset(db):
+    users = await db.users.find({"email": {"$regex": r"^bench-\d+@example\.com$"}}, {"_id": 1}).to_list(None)
+    user_ids = [str(user["_id"]) for user in users]
+    for collection in ("transactions", "budgets", "monthly_rollups", "insights", "category_overrides"):
+        await db[collection].delete_many({"user_id": {"$in": user_ids}})
+    await db.users.delete_many({"_id": {"$in": [user["_id"] for user in users]}})
+    return len(user_ids)
+
+
+async def seed_users(db, count, password):
+    # One hash for everyone: seeding a million users should not take a million bcrypt rounds
+    hashed = pwd_context.hash(password)
+    docs = [{"username": f"bench-{n}", "email": EMAIL.format(n), "hashed_password": hashed} for n in range(count)]
+    result = await db.users.insert_many(docs, ordered=False)
+    return [str(user_id) for user_id in result.inserted_ids]
+
+
+def transaction_batches(user_ids, rows, years, rng, chunk):
+    end = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    span = years * 365 * 86400
+    categories = list(EXPENSES)
+    weights = {user_id: [rng.random() for _ in categories] for user_id in user_ids}
+
+    batch = []
+    for n in range(rows):
+        user_id = user_ids[n % len(user_ids)]
+        date = end - timedelta(seconds=rng.randrange(span))
+        if rng.random() < 0.08:
+            doc = {"amount": round(rng.uniform(1500, 5000), 2), "type": "income", "category": "Income",
+                   "description": "Salary"}
+        else:
+            category = rng.choices(categories, weights[user_id])[0]
+            doc = {"amount": round(rng.uniform(2, 250), 2), "type": "expense", "category": category,
+                   "description": rng.choice(EXPENSES[category])}
+        batch.append({"user_id": user_id, "date": date, "category_source": "model", **doc})
+        if len(batch) >= chunk:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def seed_budgets(db, user_ids, rng):
+    month = datetime.utcnow().replace(day=1)
+    months = []
+    for _ in range(12):
+        months.append(month.strftime("%Y-%m"))
+        month = (month - timedelta(days=1)).replace(day=1)
+
+    docs = [
+        {"user_id": user_id, "month": key, "amount": round(rng.uniform(800, 3000), 2), "created_at": datetime.utcnow()}
+        for user_id in user_ids for key in months
+    ]
+    for offset in range(0, len(docs), 10000):
+        await db.budgets.insert_many(docs[offset:offset + 10000], ordered=False)
+
+
+async def run(args):
+    db = get_db()
+    rng = random.Random(args.seed)
+    rows = SCALES[args.scale]
+    timings = {}
+
+    await ensure_indexes(db)
+    if args.reset:
+        start = time.perf_counter()
+        removed = await reset(db)
+        timings["reset_seconds"] = round(time.perf_counter() - start, 2)
+        timings["removed_users"] = removed
+
+    start = time.perf_counter()
+    user_ids = await seed_users(db, args.users, args.password)
+    await seed_budgets(db, user_ids, rng)
+    timings["users_seconds"] = round(time.perf_counter() - start, 2)
+
+    start = time.perf_counter()
+    for batch in transaction_batches(user_ids, rows, args.years, rng, args.chunk):
+        await db.transactions.insert_many(batch, ordered=False)
+    timings["transactions_seconds"] = round(time.perf_counter() - start, 2)
+
+    start = time.perf_counter()
+    # Only the users seeded here; other data in the database keeps its rollups
+    await rebuild_rollups(db, user_ids)
+    timings["rollups_seconds"] = round(time.perf_counter() - start, 2)
+
+    print(json.dumps({"scale": args.scale, "users": len(user_ids), "transactions": rows, **timings}, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=list(SCALES), default="10k", help="total transactions")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--password", default="bench-password")
+    parser.add_argument("--chunk", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--reset", action="store_true", help="remove a previous benchmark population first")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
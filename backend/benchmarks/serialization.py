@@ -0,0 +1,92 @@
+"""
+Encode time and allocations for a transaction list response, run from the backend directory:
+
+    python -m benchmarks.serialization --rows 10000
+
+- before: the old path; serialize_documents rewrites each `_id`, then
+  FastAPI's jsonable_encoder walks the result and the stdlib json encodes it
+- after: DocumentResponse, a single orjson pass over the raw documents
+
+Allocations are the tracemalloc peak during one encode.
+"""
+import argparse
+import json
+import random
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from utils.serializer import DocumentResponse
+
+CATEGORIES = ["Food & Drink", "Travel", "Groceries", "Entertainment", "Income"]
+
+
+def make_transactions(rows):
+    start = datetime(2020, 1, 1)
+    user_id = str(ObjectId())
+    return [{
+        "_id": ObjectId(),
+        "user_id": user_id,
+        "amount": round(random.uniform(1, 500), 2),
+        "category": random.choice(CATEGORIES),
+        "category_source": "model",
+        "type": random.choice(["expense", "income"]),
+        "description": "bench row",
+        "date": start + timedelta(minutes=random.randint(0, 60 * 24 * 1500))
+    } for _ in range(rows)]
+
+
+def encode_before(transactions):
+    # serialize_documents as it was: stringify _id in place
+    for document in transactions:
+        document["_id"] = str(document["_id"])
+    content = jsonable_encoder({"transactions": transactions, "next_cursor": None})
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def encode_after(transactions):
+    return DocumentResponse({"transactions": transactions, "next_cursor": None}).body
+
+
+def measure(encode, rows, repeat):
+    seconds = []
+    for _ in range(repeat):
+        transactions = make_transactions(rows)
+        start = time.perf_counter()
+        body = encode(transactions)
+        seconds.append(time.perf_counter() - start)
+
+    transactions = make_transactions(rows)
+    tracemalloc.start()
+    encode(transactions)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "best_ms": round(min(seconds) * 1000, 2),
+        "mean_ms": round(sum(seconds) / len(seconds) * 1000, 2),
+        "peak_alloc_mb": round(peak / (1024 * 1024), 2),
+        "bytes": len(body)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    random.seed(7)
+    before = measure(encode_before, args.rows, args.repeat)
+    after = measure(encode_after, args.rows, args.repeat)
+    print(json.dumps({
+        "rows": args.rows,
+        "before": before,
+        "after": after,
+        "speedup": round(before["best_ms"] / after["best_ms"], 1) if after["best_ms"] else None
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,21 @@
 from fastapi import APIRouter, HTTPException, Depends, Query
 from datetime import datetime
-from .model import BudgetInput
-from database import db  # your MongoDB client
+from pymongo import UpdateOne
+from typing import List
+from .model import BudgetInput, BudgetMonth
+from database import get_db, get_analytics_db, record_write
 from defendecies import get_current_user
+from utils.date_window import month_window, month_keys, month_count
+from summary import rollups
+from utils.response_cache import response_cache
 
 router = APIRouter()
 
 @router.post("/budget/set")
-async def set_budget(data: BudgetInput, user_id: str = Depends(get_current_user)):
+async def set_budget(data: BudgetInput, user: dict = Depends(get_current_user)):
     try:
+        db = get_db()
+        user_id = str(user["_id"])
         # Use provided month or default to current month
         month = data.month or datetime.now().strftime("%Y-%m")
         
@@ -26,6 +33,8 @@ async def set_budget(data: BudgetInput, user_id: str = Depends(get_current_user)
         }
 
         await db.budgets.insert_one(budget_doc)
+        record_write(user_id)
+        await response_cache.bump(user_id)
 
         return {"message": "Budget set successfully", "month": month, "amount": data.amount}
 
@@ -36,8 +45,10 @@ async def set_budget(data: BudgetInput, user_id: str = Depends(get_current_user)
 
 
 @router.get("/budget/get")
-async def get_budget(month: str = Query(None), user_id: str = Depends(get_current_user)):
+async def get_budget(month: str = Query(None), user: dict = Depends(get_current_user)):
     try:
+        db = get_db()
+        user_id = str(user["_id"])
         # Use current month if not provided
         target_month = month or datetime.now().strftime("%Y-%m")
 
@@ -58,8 +69,10 @@ async def get_budget(month: str = Query(None), user_id: str = Depends(get_curren
 
 
 @router.put("/budget/update")
-async def update_budget(data: BudgetInput, user_id: str = Depends(get_current_user)):
+async def update_budget(data: BudgetInput, user: dict = Depends(get_current_user)):
     try:
+        db = get_db()
+        user_id = str(user["_id"])
         month = data.month or datetime.now().strftime("%Y-%m")
 
         # Find and update budget
@@ -70,6 +83,8 @@ async def update_budget(data: BudgetInput, user_id: str = Depends(get_current_us
 
         if result.modified_count == 0:
             raise HTTPException(status_code=404, detail="No budget found to update")
+        record_write(user_id)
+        await response_cache.bump(user_id)
 
         return {"message": "Budget updated successfully", "month": month, "amount": data.amount}
 
@@ -79,13 +94,17 @@ async def update_budget(data: BudgetInput, user_id: str = Depends(get_current_us
 
 
 @router.delete("/budget/delete")
-async def delete_budget(month: str = Query(None), user_id: str = Depends(get_current_user)):
+async def delete_budget(month: str = Query(None), user: dict = Depends(get_current_user)):
     try:
+        db = get_db()
+        user_id = str(user["_id"])
         target_month = month or datetime.now().strftime("%Y-%m")
 
         result = await db.budgets.delete_one({"user_id": user_id, "month": target_month})
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="No budget found to delete")
+        record_write(user_id)
+        await response_cache.bump(user_id)
 
         return {"message": "Budget deleted successfully", "month": target_month}
 
@@ -94,47 +113,144 @@ async def delete_budget(month: str = Query(None), user_id: str = Depends(get_cur
     
 
 
+async def compute_budget_progress(db, user_id, target_month):
+    # Get budget
+    budget = await db.budgets.find_one({"user_id": user_id, "month": target_month})
+    if not budget:
+        raise HTTPException(status_code=404, detail="No budget found for this month")
+
+    # Get total spending for the month from the rollups
+    start, end = month_window(target_month)
+    month_rollups = await rollups.read_rollups(db, user_id, rollups.month_range(start, end), type="expense")
+    _, total_spent, _, _ = rollups.summarize(month_rollups)
+
+    remaining = budget["amount"] - total_spent
+    percentage_used = round((total_spent / budget["amount"]) * 100, 2)
+
+    return {
+        "month": target_month,
+        "budget": budget["amount"],
+        "total_spent": total_spent,
+        "remaining_budget": remaining,
+        "percentage_used": percentage_used
+    }
+
+
 @router.get("/budget/track-progress")
-async def track_budget_progress(month: str = Query(None), user_id: str = Depends(get_current_user)):
+async def track_budget_progress(month: str = Query(None), user: dict = Depends(get_current_user)):
     try:
+        user_id = str(user["_id"])
+        db = await get_analytics_db(user_id)
         target_month = month or datetime.now().strftime("%Y-%m")
 
-        # Get budget
-        budget = await db.budgets.find_one({"user_id": user_id, "month": target_month})
-        if not budget:
-            raise HTTPException(status_code=404, detail="No budget found for this month")
-
-        # Get total spending for the month
-        transactions = db.transactions.aggregate([
-            {
-                "$match": {
-                    "user_id": user_id,
-                    "date": {"$regex": f"^{target_month}"},
-                    "type": "expense"
-                }
-            },
-            {
-                "$group": {
-                    "_id": None,
-                    "total_spent": {"$sum": "$amount"}
-                }
-            }
-        ])
-
-        spent_data = await transactions.to_list(1)
-        total_spent = spent_data[0]["total_spent"] if spent_data else 0.0
-
-        remaining = budget["amount"] - total_spent
-        percentage_used = round((total_spent / budget["amount"]) * 100, 2)
+        return await compute_budget_progress(db, user_id, target_month)
 
-        return {
-            "month": target_month,
-            "budget": budget["amount"],
-            "total_spent": total_spent,
-            "remaining_budget": remaining,
-            "percentage_used": percentage_used
-        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to track budget progress: {str(e)}")
+
+
+
+# Longest range /budget/progress answers in one call
+MAX_PROGRESS_MONTHS = 120
 
+
+def progress_pipeline(user_id, months):
+    """Budgets and monthly expense rollups for a month range, merged per month in one aggregation"""
+    month_filter = {"$gte": months[0], "$lte": months[-1]}
+    return [
+        {"$match": {"user_id": user_id, "month": month_filter}},
+        {"$project": {"_id": 0, "month": 1, "budget": "$amount", "spent": {"$literal": 0}}},
+        {"$unionWith": {"coll": "monthly_rollups", "pipeline": [
+            {"$match": {"user_id": user_id, "month": month_filter, "type": "expense"}},
+            {"$project": {"_id": 0, "month": 1, "budget": {"$literal": None}, "spent": "$total"}}
+        ]}},
+        {"$group": {"_id": "$month", "budget": {"$max": "$budget"}, "spent": {"$sum": "$spent"}}}
+    ]
+
+
+async def compute_budget_range(db, user_id, months):
+    rows = await db.budgets.aggregate(progress_pipeline(user_id, months), comment="budget:progress").to_list(None)
+    by_month = {row["_id"]: row for row in rows}
+
+    progress = []
+    for month in months:
+        row = by_month.get(month, {})
+        budget, spent = row.get("budget"), round(row.get("spent", 0), 2)
+        progress.append({
+            "month": month,
+            "budget": budget,
+            "total_spent": spent,
+            "remaining_budget": round(budget - spent, 2) if budget is not None else None,
+            "percentage_used": round(spent / budget * 100, 2) if budget else None
+        })
+    return progress
+
+
+@router.get("/budget/progress")
+async def budget_progress_range(
+    from_month: str = Query(..., alias="from", description="First month, YYYY-MM"),
+    to_month: str = Query(None, alias="to", description="Last month, YYYY-MM (defaults to from)"),
+    user: dict = Depends(get_current_user)
+):
+    try:
+        user_id = str(user["_id"])
+        db = await get_analytics_db(user_id)
+        to_month = to_month or from_month
+        try:
+            count = month_count(from_month, to_month)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Months must be YYYY-MM")
+        # Checked before building the keys, so a huge range costs nothing
+        if not 1 <= count <= MAX_PROGRESS_MONTHS:
+            raise HTTPException(status_code=400, detail=f"Range must cover 1 to {MAX_PROGRESS_MONTHS} months")
+        months = month_keys(from_month, to_month)
+
+        return {"from": months[0], "to": months[-1], "months": await compute_budget_range(db, user_id, months)}
+
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to track budget progress: {str(e)}")
 
+
+@router.put("/budget/bulk")
+async def bulk_set_budgets(data: List[BudgetMonth], user: dict = Depends(get_current_user)):
+    """Create or update budgets for many months in one bulk_write"""
+    try:
+        db = get_db()
+        user_id = str(user["_id"])
+
+        amounts = {}
+        for item in data:
+            try:
+                # Stored normalised ('2025-1' -> '2025-01'), the form every reader queries by
+                month = datetime.strptime(item.month, "%Y-%m").strftime("%Y-%m")
+            except ValueError:
+                raise HTTPException(status_code=400, detail=f"Invalid month '{item.month}', expected YYYY-MM")
+            amounts[month] = item.amount
+        if not amounts:
+            raise HTTPException(status_code=400, detail="No budgets given")
+
+        now = datetime.utcnow()
+        result = await db.budgets.bulk_write([
+            UpdateOne(
+                {"user_id": user_id, "month": month},
+                {"$set": {"amount": amount}, "$setOnInsert": {"created_at": now}},
+                upsert=True
+            )
+            for month, amount in amounts.items()
+        ], ordered=False)
+        record_write(user_id)
+        await response_cache.bump(user_id)
+
+        return {
+            "message": "Budgets saved successfully",
+            "created": result.upserted_count,
+            "updated": result.matched_count,
+            "months": sorted(amounts)
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to save budgets: {str(e)}")
@@ -6,6 +6,10 @@ class BudgetInput(BaseModel):
     amount: float
     month: Optional[str] = None  #
 
+class BudgetMonth(BaseModel):
+    month: str
+    amount: float
+
 class BudgetUpdate(BaseModel):
     amount: float
 
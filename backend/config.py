@@ -1,4 +1,110 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
 
 SECRET_KEY = "mysecretkey"  # You should make this secret, not hardcoded.
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+
+# Key for the /internal stats endpoints (see internal.py); unset hides them
+INTERNAL_API_KEY = os.getenv("INTERNAL_API_KEY")
+
+# MongoDB client and connection pool (see database.py); size the pool per uvicorn worker
+MONGO_DB_NAME = os.getenv("MONGO_DB_NAME", "finance_manager")
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000"))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "5000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "30000"))
+MONGO_READ_PREFERENCE = os.getenv("MONGO_READ_PREFERENCE", "primary")
+# zlib needs no extra packages; snappy/zstd need python-snappy/zstandard
+MONGO_COMPRESSORS = os.getenv("MONGO_COMPRESSORS", "zlib")
+
+# Analytical reads (see database.get_analytics_db); MongoDB requires max staleness >= 90s
+MONGO_ANALYTICS_READ_PREFERENCE = os.getenv("MONGO_ANALYTICS_READ_PREFERENCE", "secondaryPreferred")
+MONGO_MAX_STALENESS_SECONDS = int(os.getenv("MONGO_MAX_STALENESS_SECONDS", "90"))
+READ_YOUR_WRITES_SECONDS = int(os.getenv("READ_YOUR_WRITES_SECONDS", str(MONGO_MAX_STALENESS_SECONDS)))
+READ_YOUR_WRITES_USERS = int(os.getenv("READ_YOUR_WRITES_USERS", "100000"))
+
+# Request and query instrumentation (see utils/instrumentation.py); 0 disables the slow-query log
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+
+# Cross-worker invalidation from change streams (see utils/change_feed.py)
+CHANGE_STREAM_ENABLED = os.getenv("CHANGE_STREAM_ENABLED", "true").lower() == "true"
+# Pre-images let deletes name their user; turned on for transactions and budgets at startup (MongoDB 6+)
+CHANGE_STREAM_PRE_IMAGES = os.getenv("CHANGE_STREAM_PRE_IMAGES", "true").lower() == "true"
+# Owners of recently changed documents, the fallback for deletes without a pre-image
+CHANGE_STREAM_OWNER_CACHE_SIZE = int(os.getenv("CHANGE_STREAM_OWNER_CACHE_SIZE", "100000"))
+CHANGE_STREAM_MAX_BACKOFF_SECONDS = float(os.getenv("CHANGE_STREAM_MAX_BACKOFF_SECONDS", "30"))
+
+# Admission control (see utils/admission.py); costs are per-endpoint token weights
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+ADMISSION_RATE = float(os.getenv("ADMISSION_RATE", "20"))
+ADMISSION_BURST = float(os.getenv("ADMISSION_BURST", "100"))
+# Concurrent /dashboard and /ai requests per worker, and how many may wait for a slot
+ADMISSION_MAX_CONCURRENT = int(os.getenv("ADMISSION_MAX_CONCURRENT", "32"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "64"))
+ADMISSION_QUEUE_TIMEOUT_SECONDS = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", "2"))
+
+# Current-user cache (see defendecies.get_current_user)
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL_SECONDS = int(os.getenv("USER_CACHE_TTL_SECONDS", "300"))
+# When enabled, tokens carry the user id and email so requests skip the users lookup
+JWT_EMBED_USER_CLAIMS = os.getenv("JWT_EMBED_USER_CLAIMS", "false").lower() == "true"
+
+# Password hashing (see authentication/auth.py)
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+HASH_MAX_CONCURRENCY = int(os.getenv("HASH_MAX_CONCURRENCY", "2"))
+
+# Run the explain() index check from indexes.py at startup
+INDEX_PLAN_CHECK = os.getenv("INDEX_PLAN_CHECK", "false").lower() == "true"
+
+# Transaction listing page size (see transaction_route.list_transactions)
+TRANSACTION_PAGE_SIZE = int(os.getenv("TRANSACTION_PAGE_SIZE", "50"))
+TRANSACTION_MAX_PAGE_SIZE = int(os.getenv("TRANSACTION_MAX_PAGE_SIZE", "500"))
+
+# Bulk transaction import (see transaction_route.bulk_add_transactions)
+BULK_MAX_ROWS = int(os.getenv("BULK_MAX_ROWS", "50000"))
+BULK_INSERT_CHUNK = int(os.getenv("BULK_INSERT_CHUNK", "1000"))
+BULK_MAX_BYTES = int(os.getenv("BULK_MAX_BYTES", str(25 * 1024 * 1024)))
+
+# Expense categoriser micro-batching (see transaction/categorizer.py)
+CATEGORIZER_MAX_BATCH_SIZE = int(os.getenv("CATEGORIZER_MAX_BATCH_SIZE", "64"))
+CATEGORIZER_MAX_WAIT_MS = float(os.getenv("CATEGORIZER_MAX_WAIT_MS", "5"))
+CATEGORIZER_EXECUTOR = os.getenv("CATEGORIZER_EXECUTOR", "thread")  # "thread" or "process"
+CATEGORIZER_WORKERS = int(os.getenv("CATEGORIZER_WORKERS", "1"))
+CATEGORY_CACHE_SIZE = int(os.getenv("CATEGORY_CACHE_SIZE", "50000"))
+# Look up per-user learned categories in Mongo before asking the model
+CATEGORY_OVERRIDES_ENABLED = os.getenv("CATEGORY_OVERRIDES_ENABLED", "false").lower() == "true"
+
+# Categoriser model artifact (see transaction/model_registry.py)
+MODEL_PATH = os.getenv("MODEL_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "expense_categorizer.pkl"))
+MODEL_MMAP = os.getenv("MODEL_MMAP", "true").lower() == "true"
+# Load the model in the background at startup instead of on the first request
+MODEL_WARM_UP = os.getenv("MODEL_WARM_UP", "true").lower() == "true"
+# Seconds between checks for a newly trained artifact; 0 disables hot reload
+MODEL_RELOAD_INTERVAL_SECONDS = float(os.getenv("MODEL_RELOAD_INTERVAL_SECONDS", "30"))
+
+# Dashboard/AI response cache (see utils/response_cache.py)
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "10000"))
+RESPONSE_CACHE_TTL_SECONDS = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "600"))
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory")
+
+# Per-widget timeout for /dashboard/overview
+DASHBOARD_WIDGET_TIMEOUT_SECONDS = float(os.getenv("DASHBOARD_WIDGET_TIMEOUT_SECONDS", "5"))
+
+# Fitted per-user forecasts (see predictions/forecasting.py)
+FORECAST_CACHE_SIZE = int(os.getenv("FORECAST_CACHE_SIZE", "10000"))
+
+# Precomputed AI insights (see predictions/insights_job.py)
+INSIGHTS_CHUNK_SIZE = int(os.getenv("INSIGHTS_CHUNK_SIZE", "500"))
+INSIGHTS_WORKERS = int(os.getenv("INSIGHTS_WORKERS", str(os.cpu_count() or 1)))
+INSIGHTS_MAX_AGE_HOURS = float(os.getenv("INSIGHTS_MAX_AGE_HOURS", "36"))
+
+# Columnar in-memory analytics for dashboard and AI reads (see summary/analytics.py)
+ANALYTICS_ENGINE_ENABLED = os.getenv("ANALYTICS_ENGINE_ENABLED", "false").lower() == "true"
+ANALYTICS_MEMORY_BUDGET_MB = int(os.getenv("ANALYTICS_MEMORY_BUDGET_MB", "256"))
+ANALYTICS_MAX_AGE_SECONDS = float(os.getenv("ANALYTICS_MAX_AGE_SECONDS", "300"))
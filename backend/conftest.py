@@ -0,0 +1,8 @@
+# Tests import the app modules the same way uvicorn does, from the backend directory
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+# benchmarks/load_test.py is a script against a live server, not a test module
+collect_ignore_glob = ["benchmarks/*"]
@@ -1,6 +1,18 @@
 from motor.motor_asyncio import AsyncIOMotorClient
-from pymongo.errors import PyMongoError
+from pymongo import monitoring
+from pymongo.read_preferences import Primary, PrimaryPreferred, Secondary, SecondaryPreferred, Nearest
 from dotenv import load_dotenv
+from threading import Lock
+from config import (
+    MONGO_DB_NAME, MONGO_MAX_POOL_SIZE, MONGO_MIN_POOL_SIZE, MONGO_MAX_IDLE_TIME_MS, MONGO_WAIT_QUEUE_TIMEOUT_MS,
+    MONGO_SERVER_SELECTION_TIMEOUT_MS, MONGO_CONNECT_TIMEOUT_MS, MONGO_SOCKET_TIMEOUT_MS, MONGO_READ_PREFERENCE,
+    MONGO_COMPRESSORS, MONGO_ANALYTICS_READ_PREFERENCE, MONGO_MAX_STALENESS_SECONDS, READ_YOUR_WRITES_SECONDS,
+    READ_YOUR_WRITES_USERS
+)
+from utils.cache import TTLCache
+from utils.metrics import Counter, Gauge
+from utils.instrumentation import command_listener
+from utils.response_cache import response_cache
 import logging
 import os
 
@@ -11,25 +23,167 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize database client
-try:
-    mongo_uri = os.getenv("MONGO_URI")
+mongo_uri = os.getenv("MONGO_URI")
+
+client = None
+db = None
+analytics_db = None
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Connection pool utilisation: open and checked-out connections and the checkout wait queue"""
+
+    def __init__(self):
+        self._lock = Lock()
+        self.open = 0
+        self.checked_out = 0
+        self.waiting = 0
+        self.checkout_failures = 0
+
+    def _add(self, **deltas):
+        with self._lock:
+            for name, delta in deltas.items():
+                setattr(self, name, getattr(self, name) + delta)
+
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_cleared(self, event): pass
+    def pool_closed(self, event): pass
+    def connection_ready(self, event): pass
+
+    def connection_created(self, event):
+        self._add(open=1)
+
+    def connection_closed(self, event):
+        self._add(open=-1)
+
+    def connection_check_out_started(self, event):
+        self._add(waiting=1)
+
+    def connection_check_out_failed(self, event):
+        self._add(waiting=-1, checkout_failures=1)
+
+    def connection_checked_out(self, event):
+        self._add(waiting=-1, checked_out=1)
+
+    def connection_checked_in(self, event):
+        self._add(checked_out=-1)
+
+    def stats(self):
+        return {
+            "max_pool_size": MONGO_MAX_POOL_SIZE,
+            "min_pool_size": MONGO_MIN_POOL_SIZE,
+            "open_connections": self.open,
+            "checked_out": self.checked_out,
+            "wait_queue": self.waiting,
+            "checkout_failures": self.checkout_failures
+        }
+
+
+pool_metrics = PoolMetrics()
+Gauge("mongo_pool_checked_out", "Connections currently checked out of the pool", callback=lambda: pool_metrics.checked_out)
+Gauge("mongo_pool_wait_queue", "Operations waiting for a pooled connection", callback=lambda: pool_metrics.waiting)
+Gauge("mongo_pool_open_connections", "Open pooled connections", callback=lambda: pool_metrics.open)
+
+
+def analytics_read_preference():
+    modes = {
+        "primary": Primary, "primaryPreferred": PrimaryPreferred, "secondary": Secondary,
+        "secondaryPreferred": SecondaryPreferred, "nearest": Nearest
+    }
+    mode = modes[MONGO_ANALYTICS_READ_PREFERENCE]
+    if mode is Primary:
+        return Primary()
+    return mode(max_staleness=MONGO_MAX_STALENESS_SECONDS)
+
+
+def create_client():
+    global client, db, analytics_db
     if not mongo_uri:
         raise ValueError("MONGO_URI is not set in the .env file.")
-    
-    client = AsyncIOMotorClient(mongo_uri)
+
+    client = AsyncIOMotorClient(
+        mongo_uri,
+        maxPoolSize=MONGO_MAX_POOL_SIZE,
+        minPoolSize=MONGO_MIN_POOL_SIZE,
+        maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+        waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+        socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+        readPreference=MONGO_READ_PREFERENCE,
+        compressors=MONGO_COMPRESSORS,
+        event_listeners=[pool_metrics, command_listener]
+    )
     logger.info("MongoDB client created successfully.")
-    
+
     # Database initialization
-    db = client["finance_manager"]
-    logger.info("Connected to 'finance_manager' database.")
-    
-except PyMongoError as e:
-    logger.error(f"Failed to connect to MongoDB: {str(e)}")
-    db = None
-except Exception as e:
-    logger.error(f"An error occurred: {str(e)}")
+    db = client[MONGO_DB_NAME]
+    analytics_db = client.get_database(MONGO_DB_NAME, read_preference=analytics_read_preference())
+    return db
+
+
+async def connect():
+    """Create the client and ping the server; called from the FastAPI lifespan"""
+    create_client()
+    await db.command("ping")
+    logger.info(f"Connected to '{MONGO_DB_NAME}' database.")
+    return db
+
+
+def close():
+    global client, db, analytics_db
+    if client is not None:
+        client.close()
+        logger.info("MongoDB client closed.")
+    client = None
     db = None
+    analytics_db = None
+
+
+def use_database(primary, analytics=None):
+    """Install stand-in handles (e.g. a local replica set or an in-process fake) in place of the client"""
+    global db, analytics_db
+    db = primary
+    analytics_db = analytics if analytics is not None else primary
+
 
 def get_db():
+    # Scripts that run outside the app lifespan get a client on first use
+    if db is None:
+        create_client()
     return db
+
+
+# Users who wrote recently; their analytical reads stay on the primary so they see their own writes
+recent_writers = TTLCache(maxsize=READ_YOUR_WRITES_USERS, ttl=READ_YOUR_WRITES_SECONDS)
+analytics_reads = Counter("mongo_analytics_reads_total", "Analytical reads by target", labelnames=["target"])
+
+
+def record_write(user_id):
+    """Call after writing a user's transactions or budgets"""
+    recent_writers.set(str(user_id), True)
+
+
+async def wrote_recently(user_id):
+    # This worker's own writes, then any worker's via the response-cache version bump
+    if recent_writers.get(user_id):
+        return True
+    return await response_cache.written_within(user_id, READ_YOUR_WRITES_SECONDS)
+
+
+async def get_analytics_db(user_id=None):
+    """
+    Handle for aggregation-heavy reads (reports, insights, forecasts).
+
+    Reads go to a secondary within the staleness bound, except for users who
+    wrote in the last READ_YOUR_WRITES_SECONDS, which stay on the primary.
+    Writes on other workers are seen through the time of the user's last
+    response-cache bump, which is shared when the cache backend is.
+    """
+    get_db()
+    if user_id is not None and await wrote_recently(str(user_id)):
+        analytics_reads.inc(target="primary")
+        return db
+    analytics_reads.inc(target="analytics")
+    return analytics_db
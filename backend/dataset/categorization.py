@@ -1,10 +1,32 @@
-import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
+"""
+Trains the expense categoriser, run from the backend directory:
+
+    python -m dataset.categorization                 # full retrain from every labelled transaction
+    python -m dataset.categorization --incremental   # only rows added since the last run
+    python -m dataset.categorization --seed-only     # the built-in sample data, no database
+
+Labelled transactions are streamed from Mongo in chunks and learned out-of-core
+with HashingVectorizer + MultinomialNB.partial_fit, so memory stays flat as the
+collection grows. Each run writes a versioned artifact under models/ and then
+replaces the active expense_categorizer.pkl, which the running API hot-reloads.
+"""
+from sklearn.feature_extraction.text import HashingVectorizer
 from sklearn.naive_bayes import MultinomialNB
 from sklearn.pipeline import make_pipeline
+from pymongo import MongoClient
+from bson import ObjectId
+from datetime import datetime
+from config import MODEL_PATH, MONGO_DB_NAME
+import argparse
 import joblib
+import json
+import os
+import resource
+import sys
+import time
+import tracemalloc
 
-# Sample training data
+# Sample training data, used to bootstrap before any transactions are labelled
 data = {
     "description": [
         "Starbucks coffee", "Uber ride", "Domino's Pizza", "Netflix", "Monthly salary", "Grocery store", "Bus ticket"
@@ -14,11 +36,144 @@ data = {
     ]
 }
 
-df = pd.DataFrame(data)
+MODELS_DIR = os.path.join(os.path.dirname(MODEL_PATH), "models")
+
+# Categories the model guessed itself are not used as training labels
+LABELLED = {"category": {"$nin": [None, ""]}, "category_source": {"$ne": "model"}}
+
+
+def new_pipeline(n_features):
+    # alternate_sign=False keeps features non-negative, as MultinomialNB requires
+    vectorizer = HashingVectorizer(n_features=n_features, alternate_sign=False, norm="l2")
+    return vectorizer, MultinomialNB()
+
+
+def stream_labelled(collection, since_id=None, chunk_size=50000):
+    """Yield (descriptions, categories, last_id) chunks in _id order"""
+    query = dict(LABELLED)
+    if since_id is not None:
+        query["_id"] = {"$gt": since_id}
+
+    descriptions, categories, last_id = [], [], None
+    cursor = collection.find(query, {"description": 1, "category": 1}).sort("_id", 1).batch_size(chunk_size)
+    for document in cursor:
+        descriptions.append(document.get("description") or "")
+        categories.append(document["category"])
+        last_id = document["_id"]
+        if len(descriptions) >= chunk_size:
+            yield descriptions, categories, last_id
+            descriptions, categories = [], []
+    if descriptions:
+        yield descriptions, categories, last_id
+
+
+def load_previous():
+    """The active hashing model and its metadata, if the last run can be continued"""
+    try:
+        with open(MODEL_PATH + ".json") as f:
+            metadata = json.load(f)
+    except (OSError, ValueError):
+        return None, None
+    if "last_id" not in metadata:
+        return None, None
+    return joblib.load(MODEL_PATH), metadata
+
+
+def train(collection, incremental=False, chunk_size=50000, n_features=2 ** 18):
+    previous, metadata = load_previous() if incremental else (None, None)
+    classes = sorted(set(collection.distinct("category", LABELLED)) | set(data["category"]))
+
+    since_id = None
+    rows = metadata.get("rows", 0) if metadata else 0
+    if previous is not None and set(classes) <= set(previous[-1].classes_):
+        vectorizer, classifier = previous[0], previous[-1]
+        # partial_fit needs exactly the classes of the first fit, even if only some are still in use
+        classes = list(classifier.classes_)
+        since_id = ObjectId(metadata["last_id"]) if metadata["last_id"] else None
+        mode = "incremental"
+    else:
+        # New categories cannot be added to a fitted MultinomialNB, so start over
+        vectorizer, classifier = new_pipeline(n_features)
+        classifier.partial_fit(vectorizer.transform(data["description"]), data["category"], classes=classes)
+        rows = len(data["description"])
+        mode = "full"
+
+    last_id = since_id
+    for descriptions, categories, chunk_last_id in stream_labelled(collection, since_id, chunk_size):
+        classifier.partial_fit(vectorizer.transform(descriptions), categories, classes=classes)
+        rows += len(descriptions)
+        last_id = chunk_last_id
+
+    return make_pipeline(vectorizer, classifier), {
+        "mode": mode,
+        "rows": rows,
+        "last_id": str(last_id) if last_id is not None else None,
+        "classes": list(classifier.classes_),
+        "n_features": vectorizer.n_features
+    }
+
+
+def train_seed_only():
+    vectorizer, classifier = new_pipeline(2 ** 18)
+    classifier.fit(vectorizer.transform(data["description"]), data["category"])
+    return make_pipeline(vectorizer, classifier), {
+        "mode": "seed",
+        "rows": len(data["description"]),
+        "classes": list(classifier.classes_),
+        "n_features": vectorizer.n_features
+    }
+
+
+def save(model, metadata):
+    """Write models/expense_categorizer-<version>.pkl and atomically make it the active artifact"""
+    os.makedirs(MODELS_DIR, exist_ok=True)
+    versioned_path = os.path.join(MODELS_DIR, f"expense_categorizer-{metadata['version']}.pkl")
+    joblib.dump(model, versioned_path)
+    with open(versioned_path + ".json", "w") as f:
+        json.dump(metadata, f, indent=2)
+
+    # Sidecar first, so the registry never sees the new model with the old version
+    for source, target in ((versioned_path + ".json", MODEL_PATH + ".json"), (versioned_path, MODEL_PATH)):
+        with open(source, "rb") as src, open(target + ".tmp", "wb") as dst:
+            dst.write(src.read())
+        os.replace(target + ".tmp", target)
+    return versioned_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--incremental", action="store_true")
+    parser.add_argument("--seed-only", action="store_true")
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    parser.add_argument("--n-features", type=int, default=2 ** 18)
+    args = parser.parse_args()
+
+    tracemalloc.start()
+    start = time.perf_counter()
+
+    if args.seed_only:
+        model, metadata = train_seed_only()
+    else:
+        from database import mongo_uri
+        client = MongoClient(mongo_uri)
+        try:
+            model, metadata = train(client[MONGO_DB_NAME].transactions, args.incremental, args.chunk_size, args.n_features)
+        finally:
+            client.close()
+
+    _, peak_traced = tracemalloc.get_traced_memory()
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    metadata.update({
+        "version": datetime.utcnow().strftime("%Y%m%d%H%M%S"),
+        "trained_at": datetime.utcnow().isoformat(),
+        "training_seconds": round(time.perf_counter() - start, 3),
+        "peak_python_mb": round(peak_traced / (1024 * 1024), 1),
+        "peak_rss_mb": round(peak_rss / (1024 * 1024) if sys.platform == "darwin" else peak_rss / 1024, 1)
+    })
+
+    path = save(model, metadata)
+    print(json.dumps({"artifact": path, **{key: value for key, value in metadata.items() if key != "classes"}}, indent=2))
 
-# Train the model
-model = make_pipeline(TfidfVectorizer(), MultinomialNB())
-model.fit(df['description'], df['category'])
 
-# Save the model
-joblib.dump(model, "expense_categorizer.pkl")
+if __name__ == "__main__":
+    main()
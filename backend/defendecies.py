@@ -1,31 +1,84 @@
 
-from fastapi import HTTPException,status,Depends
+from fastapi import HTTPException,status,Depends,Header
 from fastapi.security import OAuth2PasswordBearer
 from jose import ExpiredSignatureError, JWTError,jwt
-from config import ALGORITHM,SECRET_KEY
+from bson import ObjectId
+from bson.errors import InvalidId
+from config import ALGORITHM,SECRET_KEY,USER_CACHE_SIZE,USER_CACHE_TTL_SECONDS,JWT_EMBED_USER_CLAIMS,INTERNAL_API_KEY
 from database import get_db
+from utils.cache import TTLCache
+import hmac
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
+# Principals keyed by token subject (email)
+user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL_SECONDS)
+claims_hits = 0
+
+
+def invalidate_user(email=None, user_id=None):
+    """Drop a cached principal after the user document changes or is deleted"""
+    if email:
+        user_cache.pop(email)
+    if user_id:
+        user_cache.pop_where(lambda user: str(user["_id"]) == str(user_id))
+
+
+def user_cache_stats():
+    stats = user_cache.stats()
+    stats["claims_hits"] = claims_hits
+    return stats
+
+
+def principal_from_claims(payload):
+    # Tokens issued with JWT_EMBED_USER_CLAIMS carry everything the routes need
+    global claims_hits
+    if not JWT_EMBED_USER_CLAIMS or not payload.get("uid"):
+        return None
+    try:
+        user_id = ObjectId(payload["uid"])
+    except InvalidId:
+        return None
+
+    claims_hits += 1
+    return {"_id": user_id, "email": payload["sub"], "username": payload.get("username")}
+
 
 async def get_current_user(token: str = Depends(oauth2_scheme)):
-    """Decode JWT and fetch current user from DB"""
+    """Decode JWT and resolve the current user from token claims, the cache or the DB"""
     try:
-        db = get_db()
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_email = payload.get("sub")
 
         if not user_email:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate credentials")
 
+        user = principal_from_claims(payload)
+        if user:
+            return user
+
+        user = user_cache.get(user_email)
+        if user:
+            return dict(user)
+
+        db = get_db()
         user = await db.users.find_one({"email": user_email})
         if not user:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
-        return user
+        user_cache.set(user_email, user)
+        return dict(user)
 
     except ExpiredSignatureError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token has expired")
     except JWTError as e:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=f"Invalid token: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=f"Invalid token: {str(e)}")
+
+
+async def require_internal_key(x_internal_key: str = Header(None)):
+    """Operators only: the X-Internal-Key header must match INTERNAL_API_KEY"""
+    if not INTERNAL_API_KEY:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if not x_internal_key or not hmac.compare_digest(x_internal_key, INTERNAL_API_KEY):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid internal key")
@@ -0,0 +1,158 @@
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# Indexes every collection needs, applied at startup (see main.lifespan)
+INDEXES = {
+    "transactions": [
+        # Listing, date-range summaries and full-history AI pipelines
+        IndexModel([("user_id", ASCENDING), ("date", DESCENDING), ("_id", DESCENDING)], name="user_date"),
+        # Reports that match on type (expense breakdowns, budget progress)
+        IndexModel([("user_id", ASCENDING), ("type", ASCENDING), ("date", DESCENDING)], name="user_type_date"),
+        # /transactions/filter by category
+        IndexModel([("user_id", ASCENDING), ("category", ASCENDING), ("date", DESCENDING)], name="user_category_date"),
+    ],
+    "budgets": [
+        IndexModel([("user_id", ASCENDING), ("month", ASCENDING)], name="user_month", unique=True),
+    ],
+    "monthly_rollups": [
+        # Unique key used by $inc upserts and the rebuild $merge
+        IndexModel([("user_id", ASCENDING), ("month", ASCENDING), ("type", ASCENDING), ("category", ASCENDING)], name="rollup_key", unique=True),
+        # Insight staleness check: any rollup written after computed_at
+        IndexModel([("user_id", ASCENDING), ("updated_at", DESCENDING)], name="user_updated"),
+    ],
+    "insights": [
+        IndexModel([("user_id", ASCENDING)], name="user", unique=True),
+    ],
+    "category_overrides": [
+        IndexModel([("user_id", ASCENDING), ("description_key", ASCENDING)], name="user_description", unique=True),
+    ],
+    "users": [
+        IndexModel([("email", ASCENDING)], name="email", unique=True),
+    ],
+}
+
+
+# Representative query shapes that must be served by an index
+SAMPLE_USER_ID = "000000000000000000000000"
+SAMPLE_START = datetime(2025, 1, 1)
+SAMPLE_END = datetime(2025, 2, 1)
+
+QUERY_PLANS = [
+    ("transactions.list", "transactions", {"user_id": SAMPLE_USER_ID}, [("date", DESCENDING), ("_id", DESCENDING)]),
+    ("transactions.filter_category", "transactions", {"user_id": SAMPLE_USER_ID, "category": "Travel"}, None),
+    ("summary.date_range", "transactions", {"user_id": SAMPLE_USER_ID, "date": {"$gte": SAMPLE_START, "$lt": SAMPLE_END}}, None),
+    ("summary.expense_range", "transactions", {"user_id": SAMPLE_USER_ID, "type": "expense", "date": {"$gte": SAMPLE_START, "$lt": SAMPLE_END}}, None),
+    ("rollups.month_range", "monthly_rollups", {"user_id": SAMPLE_USER_ID, "month": {"$gte": "2025-01", "$lt": "2026-01"}, "count": {"$gt": 0}}, None),
+    ("budget.by_month", "budgets", {"user_id": SAMPLE_USER_ID, "month": "2025-01"}, None),
+    ("users.by_email", "users", {"email": "someone@example.com"}, None),
+]
+
+
+DUPLICATE_KEY_CODES = {11000, 11001}
+
+
+async def find_duplicates(db, collection, index, limit=10):
+    """Groups of documents that share a key of a unique index: [{"key": {...}, "count": n, "ids": [...]}]"""
+    fields = list(index.document["key"])
+    pipeline = [
+        {"$group": {"_id": {field: f"${field}" for field in fields}, "count": {"$sum": 1}, "ids": {"$push": "$_id"}}},
+        {"$match": {"count": {"$gt": 1}}},
+        {"$limit": limit}
+    ]
+    groups = await db[collection].aggregate(pipeline, allowDiskUse=True).to_list(None)
+    return [{"key": group["_id"], "count": group["count"], "ids": group["ids"]} for group in groups]
+
+
+async def ensure_indexes(db):
+    """
+    Create every registered index; existing indexes with the same spec are a no-op.
+
+    A unique index that cannot be built because documents already share a key
+    (e.g. two users registered with one email before the index existed) does
+    not stop startup: it is skipped and the duplicates are logged, to be
+    resolved with `python -m indexes --duplicates`. Returns the skipped
+    "collection.index" names.
+    """
+    skipped = []
+    for collection, indexes in INDEXES.items():
+        existing = set(await db[collection].index_information())
+        created = []
+        for index in indexes:
+            name = index.document["name"]
+            try:
+                created += await db[collection].create_indexes([index])
+            except OperationFailure as e:
+                if e.code not in DUPLICATE_KEY_CODES or name in existing:
+                    raise
+                duplicates = await find_duplicates(db, collection, index)
+                skipped.append(f"{collection}.{name}")
+                logger.error(
+                    f"Unique index '{name}' on '{collection}' not built: {len(duplicates)}+ keys are duplicated, "
+                    f"e.g. {duplicates[:3]}. Merge or delete the extra documents (list them with "
+                    f"'python -m indexes --duplicates'), then restart to build the index."
+                )
+        logger.info(f"Indexes ensured on '{collection}': {', '.join(created)}")
+    return skipped
+
+
+def plan_stages(plan):
+    # Walk an explain() plan tree and yield every stage name
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from plan_stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            yield from plan_stages(item)
+
+
+async def check_query_plans(db):
+    """Explain every registered query and raise if any winning plan is a collection scan"""
+    failures = []
+    for name, collection, query, sort in QUERY_PLANS:
+        cursor = db[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        explain = await cursor.explain()
+
+        stages = set(plan_stages(explain.get("queryPlanner", {}).get("winningPlan", {})))
+        if "COLLSCAN" in stages or not stages & {"IXSCAN", "IDHACK", "EXPRESS_IXSCAN"}:
+            failures.append(f"{name} ({collection}): {', '.join(sorted(stages)) or 'no plan'}")
+
+    if failures:
+        raise RuntimeError("Queries not backed by an index: " + "; ".join(failures))
+    logger.info(f"All {len(QUERY_PLANS)} registered query plans are index-backed.")
+
+
+if __name__ == "__main__":
+    import asyncio
+    import sys
+    from database import get_db
+
+    async def run():
+        db = get_db()
+        if "--duplicates" in sys.argv:
+            # Every unique key shared by several documents; keep one per key, then rerun without the flag
+            found = False
+            for collection, indexes in INDEXES.items():
+                for index in indexes:
+                    if not index.document.get("unique"):
+                        continue
+                    for group in await find_duplicates(db, collection, index, limit=1000):
+                        found = True
+                        print(f"{collection}.{index.document['name']} {group['key']} x{group['count']}: {group['ids']}")
+            sys.exit(1 if found else 0)
+
+        skipped = await ensure_indexes(db)
+        if "--check" in sys.argv:
+            await check_query_plans(db)
+        if skipped:
+            sys.exit(f"Unique indexes not built because of duplicates: {', '.join(skipped)}")
+
+    asyncio.run(run())
@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+from defendecies import require_internal_key
+from database import pool_metrics
+from utils.metrics import render_prometheus
+
+
+# Operational stats (caches, pools, queues, metrics) registered by each feature module.
+# Everything here needs the internal API key and stays out of the public OpenAPI schema.
+router = APIRouter(prefix="/internal", dependencies=[Depends(require_internal_key)], include_in_schema=False)
+
+
+@router.get("/health/db")
+async def database_health():
+    return pool_metrics.stats()
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
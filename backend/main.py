@@ -1,3 +1,5 @@
+from contextlib import asynccontextmanager
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from authentication import auth_route
@@ -5,12 +7,74 @@ from transaction import transaction_route
 from predictions import prediction_route
 from budget import budget_route
 from summary import summary_route
+import internal
+from database import connect, close, record_write
+from indexes import ensure_indexes, check_query_plans
+from summary import rollups
+from config import INDEX_PLAN_CHECK, MODEL_WARM_UP, MODEL_RELOAD_INTERVAL_SECONDS, CHANGE_STREAM_ENABLED
+from defendecies import invalidate_user, user_cache
+from predictions.forecasting import forecast_cache
+from summary.analytics import analytics_engine
+from utils.change_feed import change_feed
+from utils.response_cache import response_cache
+from transaction.model_registry import model_registry
+from utils.admission import admission_control
+from utils.instrumentation import request_metrics
+from utils.serializer import DocumentResponse
 
 
+@change_feed.subscribe
+async def invalidate_caches(user_id, collection, change):
+    """Drop this worker's cached state for a user changed by another worker"""
+    if user_id is None:
+        user_cache.clear()
+        forecast_cache.clear()
+        analytics_engine.clear()
+        await response_cache.bump_all()
+        return
 
+    if collection == "users":
+        invalidate_user(user_id=user_id)
+        return
 
-app = FastAPI()
+    # Keep this worker's analytical reads on the primary until the write has replicated
+    record_write(user_id)
+    if collection == "transactions" and change["operationType"] == "insert":
+        # New rows extend loaded columns; only edits and deletes force a reload
+        analytics_engine.append(user_id, [change["fullDocument"]])
+    elif collection == "transactions":
+        analytics_engine.invalidate(user_id)
+    # A new data version also retires the user's cached forecasts
+    await response_cache.bump(user_id)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    db = await connect()
+    await ensure_indexes(db)
+    await rollups.warn_if_missing(db)
+    if INDEX_PLAN_CHECK:
+        await check_query_plans(db)
+
+    background_tasks = []
+    if MODEL_WARM_UP:
+        background_tasks.append(asyncio.create_task(model_registry.warm_up()))
+    if MODEL_RELOAD_INTERVAL_SECONDS > 0:
+        background_tasks.append(asyncio.create_task(model_registry.watch(MODEL_RELOAD_INTERVAL_SECONDS)))
+    if CHANGE_STREAM_ENABLED:
+        background_tasks.append(asyncio.create_task(change_feed.run(db)))
+
+    yield
+
+    for task in background_tasks:
+        task.cancel()
+    close()
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=DocumentResponse)
+
+# Innermost, so shed responses still get CORS headers and show up in the request metrics
+app.middleware("http")(admission_control)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -18,12 +82,15 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"]
 )
+app.middleware("http")(request_metrics)
 
 app.include_router(auth_route.router, tags=["Auth"])
 app.include_router(transaction_route.router, tags=["Transactions"])
 app.include_router(prediction_route.router, tags=["Predictions"])
 app.include_router(budget_route.router, tags=["Budget"])
 app.include_router(summary_route.router, tags=["Summary"])
+# After the feature modules, which register their stats endpoints on it
+app.include_router(internal.router)
 
 
 @app.get("/") 
@@ -0,0 +1,51 @@
+"""
+One-off migration for legacy documents, run from the backend directory once
+per deploy that introduces it, before the new app version serves traffic:
+
+    python -m migrations.normalize_dates
+
+Steps, in order:
+
+1. transactions.date stored as a 'YYYY-MM-DD' string becomes a native date,
+   so month/year reports can use index range scans instead of $regex.
+2. budgets.user_id stored as an embedded user document becomes the user id
+   string used everywhere else.
+3. monthly_rollups are rebuilt for every user. Reports, budget progress and
+   insights read only the rollups, which live writes keep up to date but
+   which nothing else backfills. Safe to re-run; the app logs a warning at
+   startup while the rollups are missing.
+"""
+import asyncio
+import logging
+from database import get_db
+from summary.rollups import rebuild_rollups
+
+logger = logging.getLogger(__name__)
+
+
+async def normalize_transaction_dates(db):
+    result = await db.transactions.update_many(
+        {"date": {"$type": "string"}},
+        [{"$set": {"date": {"$dateFromString": {"dateString": "$date"}}}}]
+    )
+    logger.info(f"Converted {result.modified_count} string transaction dates.")
+
+
+async def normalize_budget_user_ids(db):
+    result = await db.budgets.update_many(
+        {"user_id": {"$type": "object"}},
+        [{"$set": {"user_id": {"$toString": "$user_id._id"}}}]
+    )
+    logger.info(f"Converted {result.modified_count} embedded budget user ids.")
+
+
+async def main():
+    db = get_db()
+    await normalize_transaction_dates(db)
+    await normalize_budget_user_ids(db)
+    # Last, so rollups group the normalised dates and user ids
+    await rebuild_rollups(db)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,86 @@
+"""
+AI insight payloads built from a user's monthly rollups.
+
+The builders are plain functions over rollup rows so the same code serves the
+on-demand endpoints and the nightly batch job (predictions/insights_job.py),
+which runs them in a process pool and stores the results in `insights`.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+from config import INSIGHTS_MAX_AGE_HOURS
+from .forecasting import forecast, next_month, index_month
+
+SAVINGS_CATEGORIES = ["entertainment", "food & drink", "shopping"]
+
+
+def spending_analysis_from(rows):
+    totals = defaultdict(float)
+    for row in rows:
+        totals[(row["month"], row["category"])] += row["total"]
+
+    monthly_spending = defaultdict(lambda: {})
+    for (month, category), total in sorted(totals.items(), key=lambda item: (item[0][0], -item[1])):
+        monthly_spending[month][category] = total
+    return {"monthly_spending": dict(monthly_spending)}
+
+
+def budget_prediction_from(rows):
+    expenses = [row for row in rows if row["type"] == "expense"]
+    return forecast(expenses) if expenses else None
+
+
+def savings_suggestions_from(rows):
+    totals = defaultdict(float)
+    for row in rows:
+        totals[row["category"]] += row["total"]
+    spending = sorted(totals.items(), key=lambda item: -item[1])
+
+    tips = []
+    for category, _ in spending[:3]:
+        if category and category.lower() in SAVINGS_CATEGORIES:
+            tips.append(f"Consider reducing your spending on '{category}'")
+
+    return {
+        "suggestions": tips or ["Spending is balanced. Keep it up!"]
+    }
+
+
+def build_insights(rows):
+    """All three payloads for one user; runs in the batch job's worker processes"""
+    return {
+        "spending_analysis": spending_analysis_from(rows),
+        "budget_prediction": budget_prediction_from(rows),
+        "savings_suggestions": savings_suggestions_from(rows)
+    }
+
+
+ROLLUP_FIELDS = {"_id": 0, "month": 1, "type": 1, "category": 1, "total": 1}
+
+
+async def load_rollup_rows(db, user_id):
+    return await db.monthly_rollups.find({"user_id": user_id, "count": {"$gt": 0}}, ROLLUP_FIELDS, comment="insights:rollups").to_list(None)
+
+
+async def load_fresh_insights(db, user_id):
+    """
+    Precomputed insights, or None when missing, too old, older than the
+    user's latest write, or forecasting a month that has already started
+    """
+    insights = await db.insights.find_one({"user_id": user_id})
+    if not insights:
+        return None
+
+    computed_at = insights["computed_at"]
+    if computed_at < datetime.utcnow() - timedelta(hours=INSIGHTS_MAX_AGE_HOURS):
+        return None
+
+    # Computed last month, the stored forecast is for the month that has just begun
+    prediction = insights.get("budget_prediction")
+    if prediction and prediction.get("month") != index_month(next_month()):
+        return None
+
+    # Every transaction write touches a rollup, so a newer rollup means new data
+    newer = await db.monthly_rollups.find_one({"user_id": user_id, "updated_at": {"$gt": computed_at}}, {"_id": 1})
+    if newer:
+        return None
+    return insights
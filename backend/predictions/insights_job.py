@@ -0,0 +1,82 @@
+"""
+Nightly precomputation of AI insights, run from the backend directory (e.g. from cron):
+
+    python -m predictions.insights_job [--chunk-size 500] [--workers 4]
+
+Users are processed in chunks. Each chunk costs one aggregation over
+monthly_rollups grouped by user_id; the payloads are built in a process pool
+and upserted into `insights` with a computed_at timestamp. The /ai endpoints
+serve these and only compute on demand when a user's data changed since.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pymongo import UpdateOne
+from config import INSIGHTS_CHUNK_SIZE, INSIGHTS_WORKERS
+from database import get_db
+from .insights import build_insights
+import argparse
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def chunk_pipeline(user_ids):
+    return [
+        {"$match": {"user_id": {"$in": user_ids}, "count": {"$gt": 0}}},
+        {"$group": {
+            "_id": "$user_id",
+            "rows": {"$push": {"month": "$month", "type": "$type", "category": "$category", "total": "$total"}}
+        }}
+    ]
+
+
+async def user_id_chunks(db, chunk_size):
+    chunk = []
+    async for user in db.users.find({}, {"_id": 1}).sort("_id", 1):
+        chunk.append(str(user["_id"]))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+async def run(chunk_size=INSIGHTS_CHUNK_SIZE, workers=INSIGHTS_WORKERS):
+    db = get_db()
+    loop = asyncio.get_running_loop()
+    users = 0
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        async for user_ids in user_id_chunks(db, chunk_size):
+            # Taken before reading, so writes that land during the run mark the result stale
+            computed_at = datetime.utcnow()
+            grouped = await db.monthly_rollups.aggregate(chunk_pipeline(user_ids), comment="insights_job:chunk").to_list(None)
+
+            payloads = await asyncio.gather(*[
+                loop.run_in_executor(pool, build_insights, group["rows"]) for group in grouped
+            ])
+
+            updates = [
+                UpdateOne({"user_id": group["_id"]}, {"$set": {"computed_at": computed_at, **payload}}, upsert=True)
+                for group, payload in zip(grouped, payloads)
+            ]
+            if updates:
+                await db.insights.bulk_write(updates, ordered=False)
+            users += len(updates)
+
+    logger.info(f"Computed insights for {users} users in {time.perf_counter() - start:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunk-size", type=int, default=INSIGHTS_CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=INSIGHTS_WORKERS)
+    args = parser.parse_args()
+    asyncio.run(run(args.chunk_size, args.workers))
+
+
+if __name__ == "__main__":
+    main()
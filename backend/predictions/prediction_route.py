@@ -1,12 +1,14 @@
-from statistics import LinearRegression
-from fastapi import APIRouter,status,HTTPException,Depends
+from fastapi import APIRouter,status,HTTPException,Depends,Request
 from fastapi.security import OAuth2PasswordBearer
-import joblib
-import numpy as np
-from database import get_db
-from collections import defaultdict
-from datetime import datetime
+from database import get_analytics_db
 from defendecies import get_current_user
+from utils.response_cache import response_cache
+from .forecasting import forecast_cache, next_month
+from summary import analytics
+from .insights import (
+    load_fresh_insights,
+    spending_analysis_from, budget_prediction_from, savings_suggestions_from
+)
 
 
 
@@ -15,34 +17,22 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
 
 
+async def compute_spending_analysis(db, user_id):
+    insights = await load_fresh_insights(db, user_id)
+    if insights:
+        return insights["spending_analysis"]
+
+    return spending_analysis_from(await analytics.rollup_rows(db, user_id))
+
+
 @router.get("/ai/spending-analysis")
-async def spending_analysis(token:str = Depends(oauth2_scheme)):
+async def spending_analysis(request: Request, token:str = Depends(oauth2_scheme)):
     try:
-        db = get_db()
-
         user = await get_current_user(token)
+        user_id = str(user["_id"])
+        db = await get_analytics_db(user_id)
 
-        pipeline = [
-            {"$match": {"user_id": user}},
-            {"$group": {
-                "_id": {
-                    "month": {"$substr": ["$date", 0, 7]},
-                    "category": "$category"
-                },
-                "total": {"$sum": "$amount"}
-            }},
-            {"$sort": {"_id.month": 1, "total": -1}}
-        ]
-        result = await db.transactions.aggregate(pipeline).to_list(None)
-
-        monthly_spending = defaultdict(lambda: {})
-        for r in result:
-            month = r["_id"]["month"]
-            cat = r["_id"]["category"]
-            amt = r["total"]
-            monthly_spending[month][cat] = amt
-
-        return {"monthly_spending": monthly_spending}
+        return await response_cache.serve(request, user_id, "ai.spending_analysis", {}, lambda: compute_spending_analysis(db, user_id))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
     
@@ -50,71 +40,56 @@ async def spending_analysis(token:str = Depends(oauth2_scheme)):
 
 
 
+async def compute_budget_prediction(db, user_id):
+    insights = await load_fresh_insights(db, user_id)
+    if insights:
+        result = insights["budget_prediction"]
+    else:
+        # Fitted forecasts are reused until the user's data version or the target month changes
+        key = (user_id, await response_cache.data_version(user_id), next_month())
+        result = forecast_cache.get(key)
+        if result is None:
+            result = budget_prediction_from(await analytics.rollup_rows(db, user_id))
+            forecast_cache.set(key, result)
+
+    if result is None:
+        raise HTTPException(status_code=400, detail="Not enough data for prediction")
+    return result
+
+
 @router.get("/ai/budget-prediction")
-async def budget_prediction(token: str = Depends(oauth2_scheme)):
+async def budget_prediction(request: Request, token: str = Depends(oauth2_scheme)):
     try:
-        db = get_db()
         user = await get_current_user(token)
-       
-        pipeline = [
-            {"$match": {"user_id": user}},
-            {"$group": {
-                "_id": {"$substr": ["$date", 0, 7]},  # YYYY-MM
-                "total": {"$sum": "$amount"}
-            }},
-            {"$sort": {"_id": 1}}  # Sort by month
-        ]
-        monthly_data = await db.transactions.aggregate(pipeline).to_list(None)
+        user_id = str(user["_id"])
+        db = await get_analytics_db(user_id)
 
-        if len(monthly_data) < 2:
-            raise HTTPException(status_code=400, detail="Not enough data for prediction")
+        return await response_cache.serve(
+            request, user_id, "ai.budget_prediction", {"month": next_month()}, lambda: compute_budget_prediction(db, user_id)
+        )
 
-        
-        months = list(range(len(monthly_data)))
-        totals = [entry["total"] for entry in monthly_data]
-
-        X = np.array(months).reshape(-1, 1)
-        y = np.array(totals)
-
-        model = LinearRegression()
-        model.fit(X, y)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
 
-        # Predict next month
-        next_month_index = [[len(monthly_data)]]
-        prediction = model.predict(next_month_index)[0]
 
-        return {"next_month_expense_prediction": round(prediction, 2)}
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
 
+async def compute_savings_suggestions(db, user_id):
+    insights = await load_fresh_insights(db, user_id)
+    if insights:
+        return insights["savings_suggestions"]
 
+    return savings_suggestions_from(await analytics.rollup_rows(db, user_id))
 
 
 @router.get("/ai/savings-suggestions")
-async def savings_suggestions(token: str = Depends(oauth2_scheme)):
+async def savings_suggestions(request: Request, token: str = Depends(oauth2_scheme)):
     try:
-        db = get_db()
-        
         user = await get_current_user(token)
+        user_id = str(user["_id"])
+        db = await get_analytics_db(user_id)
 
-        # Calculate category-wise spending
-        pipeline = [
-            {"$match": {"user_id": user}},
-            {"$group": {"_id": "$category", "total": {"$sum": "$amount"}}},
-            {"$sort": {"total": -1}}
-        ]
-        spending = await db.transactions.aggregate(pipeline).to_list(None)
-
-        tips = []
-        for item in spending[:3]:
-            cat = item["_id"]
-            if cat.lower() in ["entertainment", "food & drink", "shopping"]:
-                tips.append(f"Consider reducing your spending on '{cat}'")
-
-        return {
-            "suggestions": tips or ["Spending is balanced. Keep it up!"]
-        }
+        return await response_cache.serve(request, user_id, "ai.savings_suggestions", {}, lambda: compute_savings_suggestions(db, user_id))
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
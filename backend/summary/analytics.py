@@ -0,0 +1,271 @@
+"""
+Columnar per-user analytics, an in-memory alternative to the Mongo report pipelines.
+
+A user's transactions are loaded once into NumPy columns: date as int days
+since the epoch, month as a year*12+month index, amount as float64, and type
+and category as dictionary-encoded ints. Totals, category breakdowns, monthly
+and daily series and the rollup rows used by the AI insights are then
+vectorised group-bys (bincount) over a date mask.
+
+Users live in an LRU bounded by ANALYTICS_MEMORY_BUDGET_MB. transaction_route
+appends new rows to a loaded user and drops the user on updates and deletes.
+Entries also expire after ANALYTICS_MAX_AGE_SECONDS, which bounds staleness
+from writes handled by other workers. Enabled with ANALYTICS_ENGINE_ENABLED;
+otherwise every caller keeps using report_pipeline and the rollups.
+"""
+from collections import OrderedDict
+from config import ANALYTICS_ENGINE_ENABLED, ANALYTICS_MEMORY_BUDGET_MB, ANALYTICS_MAX_AGE_SECONDS
+from predictions.forecasting import index_month
+from predictions.insights import load_rollup_rows
+from utils.metrics import Counter, Gauge
+from . import report_pipeline
+import asyncio
+import functools
+import numpy as np
+import time
+
+# Sections the engine answers; anything else (top_merchants) goes to Mongo
+ENGINE_SECTIONS = ("totals", "categories", "monthly", "daily")
+TYPES = ["income", "expense"]
+EPOCH_MONTH = 1970 * 12
+
+COLUMN_FIELDS = {"_id": 0, "date": 1, "amount": 1, "type": 1, "category": 1}
+LOAD_BATCH = 10000
+
+loads = Counter("analytics_loads_total", "Users loaded into the columnar analytics engine")
+evictions = Counter("analytics_evictions_total", "Users evicted from the analytics engine")
+
+
+def day_number(date):
+    return int(np.datetime64(date, "us").astype("datetime64[D]").astype(np.int64))
+
+
+class UserColumns:
+    """One user's transactions as parallel arrays; grows by doubling on append"""
+
+    def __init__(self):
+        self.size = 0
+        self.days = np.empty(0, dtype=np.int32)
+        self.months = np.empty(0, dtype=np.int32)
+        self.amounts = np.empty(0, dtype=np.float64)
+        self.types = np.empty(0, dtype=np.int8)
+        self.categories = np.empty(0, dtype=np.int32)
+        self.category_names = []
+        self._category_codes = {}
+        self.loaded_at = time.monotonic()
+
+    @property
+    def nbytes(self):
+        return self.days.nbytes + self.months.nbytes + self.amounts.nbytes + self.types.nbytes + self.categories.nbytes
+
+    def _category_code(self, name):
+        code = self._category_codes.get(name)
+        if code is None:
+            code = self._category_codes[name] = len(self.category_names)
+            self.category_names.append(name)
+        return code
+
+    def _reserve(self, extra):
+        needed = self.size + extra
+        if needed <= len(self.amounts):
+            return
+        capacity = max(needed, 2 * len(self.amounts), 1024)
+        for name in ("days", "months", "amounts", "types", "categories"):
+            old = getattr(self, name)
+            grown = np.empty(capacity, dtype=old.dtype)
+            grown[:self.size] = old[:self.size]
+            setattr(self, name, grown)
+
+    def append(self, documents):
+        documents = [document for document in documents if document.get("type") in TYPES]
+        if not documents:
+            return
+        days = np.array([document["date"] for document in documents], dtype="datetime64[us]").astype("datetime64[D]")
+
+        self._reserve(len(documents))
+        window = slice(self.size, self.size + len(documents))
+        self.days[window] = days.astype(np.int64)
+        self.months[window] = days.astype("datetime64[M]").astype(np.int64) + EPOCH_MONTH
+        self.amounts[window] = [document["amount"] for document in documents]
+        self.types[window] = [TYPES.index(document["type"]) for document in documents]
+        self.categories[window] = [self._category_code(document.get("category")) for document in documents]
+        self.size += len(documents)
+
+    def _mask(self, start, end):
+        days = self.days[:self.size]
+        if start is None:
+            return np.ones(self.size, dtype=bool)
+        return (days >= day_number(start)) & (days < day_number(end))
+
+    def _series(self, keys, amounts, types):
+        """Income and expense sums per distinct key, sorted by key"""
+        unique, inverse = np.unique(keys, return_inverse=True)
+        income = np.bincount(inverse, weights=np.where(types == 0, amounts, 0), minlength=len(unique))
+        expense = np.bincount(inverse, weights=np.where(types == 1, amounts, 0), minlength=len(unique))
+        return unique, income, expense
+
+    def facets(self, start, end, sections):
+        """The same facet documents report_pipeline.run_report returns, for [start, end)"""
+        mask = self._mask(start, end)
+        amounts = self.amounts[:self.size][mask]
+        types = self.types[:self.size][mask]
+        facets = {}
+
+        if "totals" in sections:
+            counts = np.bincount(types, minlength=len(TYPES))
+            sums = np.bincount(types, weights=amounts, minlength=len(TYPES))
+            facets["totals"] = [
+                {"_id": name, "total": float(sums[code]), "count": int(counts[code])}
+                for code, name in enumerate(TYPES) if counts[code]
+            ]
+
+        if "categories" in sections:
+            expense = types == 1
+            codes = self.categories[:self.size][mask][expense]
+            counts = np.bincount(codes, minlength=len(self.category_names))
+            sums = np.bincount(codes, weights=amounts[expense], minlength=len(self.category_names))
+            present = np.flatnonzero(counts)
+            facets["categories"] = [
+                {"_id": self.category_names[code], "amount": float(sums[code])}
+                for code in present[np.argsort(-sums[present], kind="stable")]
+            ]
+
+        if "monthly" in sections:
+            months, income, expense = self._series(self.months[:self.size][mask], amounts, types)
+            facets["monthly"] = [
+                {"_id": index_month(int(month)), "income": float(i), "expense": float(e)}
+                for month, i, e in zip(months, income, expense)
+            ]
+
+        if "daily" in sections:
+            days, income, expense = self._series(self.days[:self.size][mask], amounts, types)
+            labels = days.astype("datetime64[D]").astype(str)
+            facets["daily"] = [
+                {"_id": label, "income": float(i), "expense": float(e)}
+                for label, i, e in zip(labels, income, expense)
+            ]
+
+        return facets
+
+    def rollup_rows(self):
+        """{month, type, category, total} rows, the shape of load_rollup_rows"""
+        ncategories = max(len(self.category_names), 1)
+        keys = (
+            (self.months[:self.size].astype(np.int64) * len(TYPES) + self.types[:self.size]) * ncategories
+            + self.categories[:self.size]
+        )
+        unique, inverse = np.unique(keys, return_inverse=True)
+        totals = np.bincount(inverse, weights=self.amounts[:self.size], minlength=len(unique))
+
+        rows = []
+        for key, total in zip(unique.tolist(), totals.tolist()):
+            rest, category = divmod(key, ncategories)
+            month, type_code = divmod(rest, len(TYPES))
+            rows.append({
+                "month": index_month(month), "type": TYPES[type_code],
+                "category": self.category_names[category], "total": total
+            })
+        return rows
+
+
+class AnalyticsEngine:
+    def __init__(self, memory_budget_bytes, max_age_seconds):
+        self.memory_budget_bytes = memory_budget_bytes
+        self.max_age_seconds = max_age_seconds
+        self._users = OrderedDict()
+        self._loading = {}
+        # Users written to while their load was in flight; that load is served once but not kept
+        self._dirty = set()
+
+    def nbytes(self):
+        return sum(columns.nbytes for columns in self._users.values())
+
+    async def _load(self, db, user_id):
+        # Fetch a batch at a time and encode it off the loop, so a large history never stalls other requests
+        columns = UserColumns()
+        cursor = db.transactions.find({"user_id": user_id}, COLUMN_FIELDS, comment="analytics:load").batch_size(LOAD_BATCH)
+        while True:
+            batch = await cursor.to_list(LOAD_BATCH)
+            if not batch:
+                break
+            await asyncio.to_thread(columns.append, batch)
+        loads.inc()
+        return columns
+
+    async def columns(self, db, user_id):
+        """The user's columns, loading them on first use; concurrent callers share one load"""
+        columns = self._users.get(user_id)
+        if columns is not None and time.monotonic() - columns.loaded_at < self.max_age_seconds:
+            self._users.move_to_end(user_id)
+            return columns
+
+        loading = self._loading.get(user_id)
+        if loading is None:
+            loading = self._loading[user_id] = asyncio.ensure_future(self._load(db, user_id))
+            loading.add_done_callback(functools.partial(self._loaded, user_id))
+        # Shielded: a caller that times out (a dashboard widget) must not cancel the load its peers wait on
+        return await asyncio.shield(loading)
+
+    def _loaded(self, user_id, loading):
+        """Done-callback of a load: keep the columns unless the user was written to meanwhile"""
+        del self._loading[user_id]
+        if loading.cancelled() or loading.exception() is not None:
+            self._dirty.discard(user_id)
+            return
+        if user_id in self._dirty:
+            self._dirty.discard(user_id)
+            return
+        self._users[user_id] = loading.result()
+        self._users.move_to_end(user_id)
+        self._evict()
+
+    def _evict(self):
+        total = self.nbytes()
+        while total > self.memory_budget_bytes and len(self._users) > 1:
+            _, columns = self._users.popitem(last=False)
+            total -= columns.nbytes
+            evictions.inc()
+
+    def append(self, user_id, documents):
+        """New transactions for a user; ignored unless the user is loaded"""
+        user_id = str(user_id)
+        if user_id in self._loading:
+            self._dirty.add(user_id)
+        columns = self._users.get(user_id)
+        if columns is not None:
+            columns.append(documents)
+            self._evict()
+
+    def invalidate(self, user_id):
+        user_id = str(user_id)
+        if user_id in self._loading:
+            self._dirty.add(user_id)
+        self._users.pop(user_id, None)
+
+    def clear(self):
+        self._dirty.update(self._loading)
+        self._users.clear()
+
+    def stats(self):
+        return {"users": len(self._users), "bytes": self.nbytes(), "budget_bytes": self.memory_budget_bytes}
+
+
+analytics_engine = AnalyticsEngine(ANALYTICS_MEMORY_BUDGET_MB * 1024 * 1024, ANALYTICS_MAX_AGE_SECONDS)
+Gauge("analytics_memory_bytes", "Bytes held by the analytics engine's columns", callback=analytics_engine.nbytes)
+Gauge("analytics_users", "Users loaded in the analytics engine", callback=lambda: len(analytics_engine._users))
+
+
+async def report_facets(db, user_id, start, end, sections, source=None):
+    """report_pipeline.run_report, answered from memory when the engine is enabled and covers the sections"""
+    if ANALYTICS_ENGINE_ENABLED and all(name in ENGINE_SECTIONS for name in sections):
+        columns = await analytics_engine.columns(db, user_id)
+        return columns.facets(start, end, sections)
+    return await report_pipeline.run_report(db, user_id, start, end, sections, source)
+
+
+async def rollup_rows(db, user_id):
+    """Monthly {month, type, category, total} rows for the AI insight builders"""
+    if ANALYTICS_ENGINE_ENABLED:
+        columns = await analytics_engine.columns(db, user_id)
+        return columns.rollup_rows()
+    return await load_rollup_rows(db, user_id)
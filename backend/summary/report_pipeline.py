@@ -0,0 +1,142 @@
+"""
+Shared builder for dashboard reports: one $match followed by one $facet that
+produces every requested section, so a report is a single round-trip and a
+single scan no matter how many sections it shows.
+
+Sections exist for two sources. "rollups" reads the pre-aggregated
+monthly_rollups collection and covers totals, categories and monthly series.
+"transactions" reads raw transactions and also supports day-level and
+description-level sections (daily, top_merchants).
+"""
+
+
+def _sum_type(type_, field):
+    return {"$sum": {"$cond": [{"$eq": ["$type", type_]}, field, 0]}}
+
+
+SECTIONS = {
+    "rollups": {
+        "totals": [
+            {"$group": {"_id": "$type", "total": {"$sum": "$total"}, "count": {"$sum": "$count"}}}
+        ],
+        "categories": [
+            {"$match": {"type": "expense"}},
+            {"$group": {"_id": "$category", "amount": {"$sum": "$total"}}},
+            {"$sort": {"amount": -1}}
+        ],
+        "monthly": [
+            {"$group": {"_id": "$month", "income": _sum_type("income", "$total"), "expense": _sum_type("expense", "$total")}},
+            {"$sort": {"_id": 1}}
+        ],
+    },
+    "transactions": {
+        "totals": [
+            {"$group": {"_id": "$type", "total": {"$sum": "$amount"}, "count": {"$sum": 1}}}
+        ],
+        "categories": [
+            {"$match": {"type": "expense"}},
+            {"$group": {"_id": "$category", "amount": {"$sum": "$amount"}}},
+            {"$sort": {"amount": -1}}
+        ],
+        "monthly": [
+            {"$group": {
+                "_id": {"$dateToString": {"format": "%Y-%m", "date": "$date"}},
+                "income": _sum_type("income", "$amount"),
+                "expense": _sum_type("expense", "$amount")
+            }},
+            {"$sort": {"_id": 1}}
+        ],
+        "daily": [
+            {"$group": {
+                "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$date"}},
+                "income": _sum_type("income", "$amount"),
+                "expense": _sum_type("expense", "$amount")
+            }},
+            {"$sort": {"_id": 1}}
+        ],
+        "top_merchants": [
+            {"$match": {"type": "expense"}},
+            {"$group": {"_id": "$description", "amount": {"$sum": "$amount"}, "count": {"$sum": 1}}},
+            {"$sort": {"amount": -1}},
+            {"$limit": 10}
+        ],
+    },
+}
+
+COLLECTIONS = {"rollups": "monthly_rollups", "transactions": "transactions"}
+
+# Sections a caller may add with ?include=
+EXTRA_SECTIONS = ("monthly", "daily", "top_merchants")
+
+
+def build_pipeline(match, sections, source="rollups"):
+    available = SECTIONS[source]
+    unknown = [name for name in sections if name not in available]
+    if unknown:
+        raise ValueError(f"Unknown report sections for {source}: {', '.join(unknown)}")
+    return [
+        {"$match": match},
+        {"$facet": {name: available[name] for name in sections}}
+    ]
+
+
+def source_for(sections):
+    """Rollups when they can answer every section, raw transactions otherwise"""
+    return "rollups" if all(name in SECTIONS["rollups"] for name in sections) else "transactions"
+
+
+def parse_include(include):
+    sections = [name.strip() for name in (include or "").split(",") if name.strip()]
+    unknown = [name for name in sections if name not in EXTRA_SECTIONS]
+    if unknown:
+        raise ValueError(f"Unknown report sections: {', '.join(unknown)}")
+    return sections
+
+
+async def run_report(db, user_id, start, end, sections, source=None):
+    """
+    Every section for one user and a [start, end) window in a single aggregation.
+    Rollups need month-aligned windows.
+    """
+    source = source or source_for(sections)
+    if source == "rollups":
+        match = {"user_id": user_id, "month": {"$gte": start.strftime("%Y-%m"), "$lt": end.strftime("%Y-%m")}, "count": {"$gt": 0}}
+    else:
+        match = {"user_id": user_id, "date": {"$gte": start, "$lt": end}}
+
+    pipeline = build_pipeline(match, sections, source)
+    result = await db[COLLECTIONS[source]].aggregate(pipeline, comment=f"report:{source}:{'+'.join(sections)}").to_list(1)
+    return result[0] if result else {name: [] for name in sections}
+
+
+def totals(facets):
+    """(total_income, total_expense, transaction_count) from the totals section"""
+    income = expense = count = 0
+    for item in facets.get("totals", []):
+        if item["_id"] == "income":
+            income = item["total"]
+        elif item["_id"] == "expense":
+            expense = item["total"]
+        count += item["count"]
+    return income, expense, count
+
+
+def categories(facets, key="amount"):
+    return [{"category": item["_id"], key: round(item["amount"], 2)} for item in facets.get("categories", [])]
+
+
+def extra_sections(facets, sections):
+    """Format the optional sections for the response body"""
+    formatted = {}
+    for name in sections:
+        if name in ("monthly", "daily"):
+            formatted[name] = [
+                {"period": item["_id"], "income": round(item["income"], 2), "expense": round(item["expense"], 2)}
+                for item in facets.get(name, [])
+            ]
+        elif name == "top_merchants":
+            formatted[name] = [
+                {"description": item["_id"], "amount": round(item["amount"], 2), "count": item["count"]}
+                for item in facets.get(name, [])
+            ]
+    return formatted
@@ -0,0 +1,224 @@
+"""
+Pre-aggregated per-month totals in the `monthly_rollups` collection.
+
+One document per (user_id, month, type, category) holds the running `total`
+and `count` of the matching transactions. transaction_route keeps it in sync
+with $inc on every write, so reports read a handful of rollups instead of
+re-aggregating raw transactions.
+
+Maintenance, from the backend directory:
+
+    python -m summary.rollups rebuild [user_id]
+    python -m summary.rollups check [user_id]
+"""
+from datetime import datetime
+from pymongo import UpdateOne
+import logging
+
+logger = logging.getLogger(__name__)
+
+KEY_FIELDS = ("user_id", "month", "type", "category")
+
+
+def month_key(date):
+    # Legacy documents may still carry 'YYYY-MM-DD' strings
+    if isinstance(date, str):
+        return date[:7]
+    return date.strftime("%Y-%m")
+
+
+def month_range(start: datetime, end: datetime):
+    """Month-aligned [start, end) window -> filter on the 'YYYY-MM' month key"""
+    return {"$gte": month_key(start), "$lt": month_key(end)}
+
+
+def rollup_key(transaction):
+    type_ = transaction["type"]
+    return {
+        "user_id": transaction["user_id"],
+        "month": month_key(transaction["date"]),
+        "type": getattr(type_, "value", type_),
+        "category": transaction.get("category")
+    }
+
+
+def rollup_update(key, amount, count):
+    return UpdateOne(
+        key,
+        {"$inc": {"total": amount, "count": count}, "$set": {"updated_at": datetime.utcnow()}},
+        upsert=True
+    )
+
+
+def transaction_updates(transaction, sign=1):
+    return [rollup_update(rollup_key(transaction), sign * transaction["amount"], sign)]
+
+
+def change_updates(old, new):
+    """Old-vs-new deltas for an updated transaction"""
+    old_key, new_key = rollup_key(old), rollup_key(new)
+    if old_key == new_key:
+        delta = new["amount"] - old["amount"]
+        if delta == 0:
+            return []
+        return [rollup_update(new_key, delta, 0)]
+    return transaction_updates(old, -1) + transaction_updates(new, 1)
+
+
+def batch_updates(transactions):
+    # Collapse many inserts into one $inc per rollup key
+    totals = {}
+    for transaction in transactions:
+        key = rollup_key(transaction)
+        ident = tuple(key[field] for field in KEY_FIELDS)
+        entry = totals.setdefault(ident, [key, 0.0, 0])
+        entry[1] += transaction["amount"]
+        entry[2] += 1
+    return [rollup_update(key, amount, count) for key, amount, count in totals.values()]
+
+
+async def apply_updates(db, updates):
+    if updates:
+        await db.monthly_rollups.bulk_write(updates, ordered=False)
+
+
+async def read_rollups(db, user_id, months, type=None):
+    """Rollup documents for a user over a month-key filter (see month_range)"""
+    query = {"user_id": user_id, "month": months, "count": {"$gt": 0}}
+    if type:
+        query["type"] = type
+    return await db.monthly_rollups.find(query, {"_id": 0}, comment="rollups:read").to_list(None)
+
+
+def summarize(rollups):
+    """Income/expense totals, transaction count and expense category totals"""
+    totals = {"income": 0.0, "expense": 0.0}
+    categories = {}
+    count = 0
+    for rollup in rollups:
+        totals[rollup["type"]] = totals.get(rollup["type"], 0.0) + rollup["total"]
+        count += rollup["count"]
+        if rollup["type"] == "expense":
+            categories[rollup["category"]] = categories.get(rollup["category"], 0.0) + rollup["total"]
+    return totals["income"], totals["expense"], count, categories
+
+
+def user_filter(user_id=None):
+    """Match one user id, a list of them, or everyone"""
+    if not user_id:
+        return {}
+    if isinstance(user_id, (list, tuple, set)):
+        return {"user_id": {"$in": list(user_id)}}
+    return {"user_id": user_id}
+
+
+def aggregation_pipeline(user_id=None, updated_at=None):
+    # Raw transactions grouped the same way the rollups are keyed
+    return [
+        {"$match": user_filter(user_id)},
+        {"$group": {
+            "_id": {
+                "user_id": "$user_id",
+                # Legacy 'YYYY-MM-DD' strings are keyed like month_key() keys them on the live path
+                "month": {"$cond": [
+                    {"$eq": [{"$type": "$date"}, "string"]},
+                    {"$substrBytes": ["$date", 0, 7]},
+                    {"$dateToString": {"format": "%Y-%m", "date": "$date"}}
+                ]},
+                "type": "$type",
+                "category": "$category"
+            },
+            "total": {"$sum": "$amount"},
+            "count": {"$sum": 1}
+        }},
+        {"$project": {
+            "_id": 0,
+            "user_id": "$_id.user_id",
+            "month": "$_id.month",
+            "type": "$_id.type",
+            "category": "$_id.category",
+            "total": 1,
+            "count": 1,
+            "updated_at": {"$literal": updated_at} if updated_at else "$$NOW"
+        }}
+    ]
+
+
+async def rebuild_rollups(db, user_id=None):
+    """Recompute rollups from raw transactions for one user, a list of users, or everyone
+
+    Rollups are replaced in place, so reports keep reading the old totals
+    until the new ones land instead of seeing an empty collection. Keys with
+    no transactions left are deleted afterwards: anything the merge did not
+    stamp and no live write has touched since the rebuild started.
+    """
+    # Truncated to BSON's millisecond precision, or the stamped rollups would compare older
+    now = datetime.utcnow()
+    rebuilt_at = now.replace(microsecond=now.microsecond // 1000 * 1000)
+    pipeline = aggregation_pipeline(user_id, rebuilt_at) + [
+        {"$merge": {"into": "monthly_rollups", "on": list(KEY_FIELDS), "whenMatched": "replace", "whenNotMatched": "insert"}}
+    ]
+    await db.transactions.aggregate(pipeline).to_list(None)
+    # $not also catches rollups written before updated_at existed
+    orphans = {**user_filter(user_id), "updated_at": {"$not": {"$gte": rebuilt_at}}}
+    await db.monthly_rollups.delete_many(orphans)
+    if isinstance(user_id, (list, tuple, set)):
+        logger.info(f"Rebuilt monthly rollups for {len(user_id)} users.")
+    else:
+        logger.info(f"Rebuilt monthly rollups for {user_id or 'all users'}.")
+
+
+async def warn_if_missing(db):
+    """Startup check: transactions exist but no rollups were ever built, so reports would read zeros"""
+    if await db.monthly_rollups.find_one({}, {"_id": 1}):
+        return False
+    if not await db.transactions.find_one({}, {"_id": 1}):
+        return False
+    logger.warning("monthly_rollups is empty while transactions exist; reports will show zero totals "
+                   "until the backfill runs: python -m migrations.normalize_dates")
+    return True
+
+
+async def check_consistency(db, user_id=None, tolerance=0.005):
+    """Compare rollups with raw transactions; returns a list of mismatched keys"""
+    expected = {}
+    async for row in db.transactions.aggregate(aggregation_pipeline(user_id)):
+        expected[tuple(row[field] for field in KEY_FIELDS)] = (row["total"], row["count"])
+
+    actual = {}
+    async for row in db.monthly_rollups.find(user_filter(user_id)):
+        if row["count"]:
+            actual[tuple(row[field] for field in KEY_FIELDS)] = (row["total"], row["count"])
+
+    mismatches = []
+    for key in expected.keys() | actual.keys():
+        want, have = expected.get(key, (0.0, 0)), actual.get(key, (0.0, 0))
+        if want[1] != have[1] or abs(want[0] - have[0]) > tolerance:
+            mismatches.append({
+                "key": dict(zip(KEY_FIELDS, key)),
+                "expected": {"total": want[0], "count": want[1]},
+                "actual": {"total": have[0], "count": have[1]}
+            })
+    return mismatches
+
+
+if __name__ == "__main__":
+    import asyncio
+    import sys
+    from database import get_db
+
+    async def run(command, user_id):
+        db = get_db()
+        if command == "rebuild":
+            await rebuild_rollups(db, user_id)
+        elif command == "check":
+            mismatches = await check_consistency(db, user_id)
+            for mismatch in mismatches:
+                print(mismatch)
+            print(f"{len(mismatches)} mismatched rollups")
+            if mismatches:
+                sys.exit(1)
+        else:
+            sys.exit("usage: python -m summary.rollups rebuild|check [user_id]")
+
+    asyncio.run(run(sys.argv[1] if len(sys.argv) > 1 else "", sys.argv[2] if len(sys.argv) > 2 else None))
@@ -1,19 +1,45 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
 from datetime import datetime, timedelta
-from database import get_db
+from database import get_analytics_db
+from config import DASHBOARD_WIDGET_TIMEOUT_SECONDS
 from defendecies import get_current_user
+from internal import router as internal_router
+from utils.date_window import month_window, year_window, day_window
+from utils.response_cache import response_cache
+from budget.budget_route import compute_budget_progress
+from predictions.prediction_route import compute_spending_analysis
+from . import report_pipeline, analytics
 from bson import ObjectId
+import asyncio
 
 router = APIRouter(prefix='/dashboard')
 
+async def compute_summary(db, user_id_str, start_date, end_date):
+    start, end = day_window(start_date, end_date)
+
+    # Whole-month ranges (the default) are served from the monthly rollups
+    source = "rollups" if start.day == 1 and end.day == 1 else "transactions"
+    facets = await analytics.report_facets(db, user_id_str, start, end, ["totals"], source)
+    total_income, total_expense, transaction_count = report_pipeline.totals(facets)
+
+    return {
+        "start_date": start_date,
+        "end_date": end_date,
+        "total_income": round(total_income, 2),
+        "total_expense": round(total_expense, 2),
+        "net_balance": round(total_income - total_expense, 2),
+        "transaction_count": transaction_count
+    }
+
+
 @router.get("/summary")
 async def dashboard_summary(
+    request: Request,
     start_date: str = Query(None),
     end_date: str = Query(None),
     user_id: str = Depends(get_current_user)
 ):
     try:
-        db = get_db()
         # Default to current month if dates not provided
         today = datetime.today()
         if not start_date:
@@ -24,46 +50,12 @@ async def dashboard_summary(
 
         # Convert user_id to string
         user_id_str = str(user_id["_id"])
+        db = await get_analytics_db(user_id_str)
 
-        # Match user's transactions within the date range
-        pipeline = [
-            {
-                "$match": {
-                    "user_id": user_id_str,
-                    "date": {
-                        "$gte": start_date,
-                        "$lte": end_date
-                    }
-                }
-            },
-            {
-                "$group": {
-                    "_id": "$type",
-                    "total": {"$sum": "$amount"},
-                    "count": {"$sum": 1}
-                }
-            }
-        ]
-        print(f"pipeline: {pipeline}")
-        data = await db.transactions.aggregate(pipeline).to_list(None)
-
-        total_income = total_expense = transaction_count = 0
-
-        for item in data:
-            if item["_id"] == "income":
-                total_income = item["total"]
-            elif item["_id"] == "expense":
-                total_expense = item["total"]
-            transaction_count += item["count"]
-
-        return {
-            "start_date": start_date,
-            "end_date": end_date,
-            "total_income": round(total_income, 2),
-            "total_expense": round(total_expense, 2),
-            "net_balance": round(total_income - total_expense, 2),
-            "transaction_count": transaction_count
-        }
+        return await response_cache.serve(
+            request, user_id_str, "dashboard.summary", {"start_date": start_date, "end_date": end_date},
+            lambda: compute_summary(db, user_id_str, start_date, end_date)
+        )
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to load summary: {str(e)}")
@@ -71,114 +63,87 @@ async def dashboard_summary(
 
 
 
+async def compute_category_wise(db, user_id_str, target_month):
+    start, end = month_window(target_month)
+    facets = await analytics.report_facets(db, user_id_str, start, end, ["categories"])
+
+    total_expense = sum(item["amount"] for item in facets["categories"])
+    breakdown = report_pipeline.categories(facets, key="total")
+
+    return {
+        "month": target_month,
+        "breakdown": breakdown,
+        "total_expense": round(total_expense, 2)
+    }
+
+
 @router.get("/category-wise")
 async def category_wise_expense(
+    request: Request,
     month: str = Query(None),
     user_id: str = Depends(get_current_user)
 ):
     try:
-        db = get_db()
         target_month = month or datetime.now().strftime("%Y-%m")
 
          # Convert user_id to string
         user_id_str = str(user_id["_id"])
+        db = await get_analytics_db(user_id_str)
 
-        pipeline = [
-            {
-                "$match": {
-                    "user_id": user_id_str,
-                    "type": "expense",
-                    "date": {"$regex": f"^{target_month}"}
-                }
-            },
-            {
-                "$group": {
-                    "_id": "$category",
-                    "total": {"$sum": "$amount"}
-                }
-            }
-        ]
-
-        results = await db.transactions.aggregate(pipeline).to_list(None)
-
-        total_expense = sum(item["total"] for item in results)
-        breakdown = [{"category": item["_id"], "total": round(item["total"], 2)} for item in results]
-
-        return {
-            "month": target_month,
-            "breakdown": breakdown,
-            "total_expense": round(total_expense, 2)
-        }
+        return await response_cache.serve(
+            request, user_id_str, "dashboard.category_wise", {"month": target_month},
+            lambda: compute_category_wise(db, user_id_str, target_month)
+        )
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to load category-wise breakdown: {str(e)}")
 
 
 
+def include_sections(include):
+    """The extra report sections asked for; unknown names are the client's mistake"""
+    try:
+        return report_pipeline.parse_include(include)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+async def compute_report(db, user_id_str, start, end, extras):
+    """Totals, expense categories and any extra sections in one aggregation"""
+    facets = await analytics.report_facets(db, user_id_str, start, end, ["totals", "categories"] + extras)
+    total_income, total_expense, transaction_count = report_pipeline.totals(facets)
+
+    return {
+        "total_income": round(total_income, 2),
+        "total_expense": round(total_expense, 2),
+        "net_balance": round(total_income - total_expense, 2),
+        "transaction_count": transaction_count,
+        "category_breakdown": report_pipeline.categories(facets),
+        **report_pipeline.extra_sections(facets, extras)
+    }
+
+
 @router.get("/monthly-report")
 async def monthly_report(
+    request: Request,
     month: str = Query(None),
+    include: str = Query(None, description="Extra sections: monthly, daily, top_merchants"),
     user_id: str = Depends(get_current_user)
 ):
+    extras = include_sections(include)
     try:
-        db = get_db()
         target_month = month or datetime.now().strftime("%Y-%m")
 
         user_id_str = str(user_id["_id"])
+        db = await get_analytics_db(user_id_str)
+        start, end = month_window(target_month)
 
-        # Aggregate income, expense, count
-        pipeline1 = [
-            {
-                "$match": {
-                    "user_id": user_id_str,
-                    "date": {"$regex": f"^{target_month}"}
-                }
-            },
-            {
-                "$group": {
-                    "_id": "$type",
-                    "total": {"$sum": "$amount"},
-                    "count": {"$sum": 1}
-                }
-            }
-        ]
-        summary = await db.transactions.aggregate(pipeline1).to_list(None)
-
-        total_income = total_expense = transaction_count = 0
-        for item in summary:
-            if item["_id"] == "income":
-                total_income = item["total"]
-            elif item["_id"] == "expense":
-                total_expense = item["total"]
-            transaction_count += item["count"]
-
-        # Category breakdown (only for expenses)   
-        pipeline2 = [
-            {
-                "$match": {
-                    "user_id": user_id_str,
-                    "type": "expense",
-                    "date": {"$regex": f"^{target_month}"}
-                }
-            },
-            {
-                "$group": {
-                    "_id": "$category",
-                    "amount": {"$sum": "$amount"}
-                }
-            }
-        ]
-        category_breakdown = await db.transactions.aggregate(pipeline2).to_list(None)
-        category_breakdown = [{"category": item["_id"], "amount": round(item["amount"], 2)} for item in category_breakdown]
+        async def compute():
+            return {"month": target_month, **await compute_report(db, user_id_str, start, end, extras)}
 
-        return {
-            "month": target_month,
-            "total_income": round(total_income, 2),
-            "total_expense": round(total_expense, 2),
-            "net_balance": round(total_income - total_expense, 2),
-            "transaction_count": transaction_count,
-            "category_breakdown": category_breakdown
-        }
+        return await response_cache.serve(
+            request, user_id_str, "dashboard.monthly_report", {"month": target_month, "include": include}, compute
+        )
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate monthly report: {str(e)}")
@@ -187,68 +152,75 @@ async def monthly_report(
 
 @router.get("/yearly-report")
 async def yearly_report(
+    request: Request,
     year: str = Query(None),
+    include: str = Query(None, description="Extra sections: monthly, daily, top_merchants"),
     user_id: str = Depends(get_current_user)
 ):
+    extras = include_sections(include)
     try:
-        db = get_db()
         target_year = year or datetime.now().strftime("%Y")
 
         user_id_str = str(user_id["_id"])
+        db = await get_analytics_db(user_id_str)
+        start, end = year_window(target_year)
+
+        async def compute():
+            return {"year": target_year, **await compute_report(db, user_id_str, start, end, extras)}
+
+        return await response_cache.serve(
+            request, user_id_str, "dashboard.yearly_report", {"year": target_year, "include": include}, compute
+        )
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to generate yearly report: {str(e)}")
+
+
+
+async def run_widget(name, coroutine):
+    """(name, data, error) for one widget; a slow or failing widget never fails the page"""
+    try:
+        return name, await asyncio.wait_for(coroutine, timeout=DASHBOARD_WIDGET_TIMEOUT_SECONDS), None
+    except asyncio.TimeoutError:
+        return name, None, f"Timed out after {DASHBOARD_WIDGET_TIMEOUT_SECONDS}s"
+    except HTTPException as e:
+        return name, None, e.detail
+    except Exception as e:
+        return name, None, str(e)
+
+
+@router.get("/overview")
+async def dashboard_overview(
+    month: str = Query(None),
+    user_id: str = Depends(get_current_user)
+):
+    """Every dashboard widget in one call: the user is resolved once and the widgets run concurrently"""
+    try:
+        target_month = month or datetime.now().strftime("%Y-%m")
+        start, end = month_window(target_month)
+        start_date = start.strftime("%Y-%m-%d")
+        end_date = (end - timedelta(days=1)).strftime("%Y-%m-%d")
+
+        user_id_str = str(user_id["_id"])
+        db = await get_analytics_db(user_id_str)
 
-        # Aggregate income, expense, count for the year
-        pipeline1 = [
-            {
-                "$match": {
-                    "user_id": user_id_str,
-                    "date": {"$regex": f"^{target_year}"}
-                }
-            },
-            {
-                "$group": {
-                    "_id": "$type",
-                    "total": {"$sum": "$amount"},
-                    "count": {"$sum": 1}
-                }
-            }
-        ]
-        summary = await db.transactions.aggregate(pipeline1).to_list(None)
-
-        total_income = total_expense = transaction_count = 0
-        for item in summary:
-            if item["_id"] == "income":
-                total_income = item["total"]
-            elif item["_id"] == "expense":
-                total_expense = item["total"]
-            transaction_count += item["count"]
-
-        # Category breakdown (only for expenses)
-        pipeline2 = [
-            {
-                "$match": {
-                    "user_id": user_id_str,
-                    "type": "expense",
-                    "date": {"$regex": f"^{target_year}"}
-                }
-            },
-            {
-                "$group": {
-                    "_id": "$category",
-                    "amount": {"$sum": "$amount"}
-                }
-            }
-        ]
-        category_breakdown = await db.transactions.aggregate(pipeline2).to_list(None)
-        category_breakdown = [{"category": item["_id"], "amount": round(item["amount"], 2)} for item in category_breakdown]
+        results = await asyncio.gather(
+            run_widget("summary", compute_summary(db, user_id_str, start_date, end_date)),
+            run_widget("category_wise", compute_category_wise(db, user_id_str, target_month)),
+            run_widget("budget_progress", compute_budget_progress(db, user_id_str, target_month)),
+            run_widget("spending_analysis", compute_spending_analysis(db, user_id_str))
+        )
 
         return {
-            "year": target_year,
-            "total_income": round(total_income, 2),
-            "total_expense": round(total_expense, 2),
-            "net_balance": round(total_income - total_expense, 2),
-            "transaction_count": transaction_count,
-            "category_breakdown": category_breakdown
+            "month": target_month,
+            "widgets": {name: data for name, data, _ in results},
+            "errors": {name: error for name, _, error in results if error}
         }
 
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to generate yearly report: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Failed to load dashboard overview: {str(e)}")
+
+
+@internal_router.get("/dashboard/analytics/stats")
+async def analytics_stats():
+    return analytics.analytics_engine.stats()
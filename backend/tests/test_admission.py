@@ -0,0 +1,72 @@
+import asyncio
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("jose")
+
+from utils import admission
+from utils.admission import TokenBuckets, ConcurrencyLimiter, endpoint_cost
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(admission.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr("utils.cache.time.monotonic", lambda: now[0])
+    return now
+
+
+def test_burst_then_refill(clock):
+    buckets = TokenBuckets(rate=2, burst=10)
+    for _ in range(10):
+        assert buckets.take("u1", 1) == 0
+    assert buckets.take("u1", 1) == pytest.approx(0.5)
+
+    clock[0] += 1
+    assert buckets.take("u1", 2) == 0
+    assert buckets.take("u1", 1) > 0
+
+
+def test_users_have_separate_buckets(clock):
+    buckets = TokenBuckets(rate=1, burst=5)
+    assert buckets.take("u1", 5) == 0
+    assert buckets.take("u1", 1) > 0
+    assert buckets.take("u2", 5) == 0
+
+
+def test_cost_above_burst_is_capped(clock):
+    buckets = TokenBuckets(rate=1, burst=5)
+    assert buckets.take("u1", 50) == 0
+    assert buckets.take("u1", 50) == pytest.approx(5)
+
+
+def test_idle_bucket_refills_to_burst_only(clock):
+    buckets = TokenBuckets(rate=1, burst=3)
+    buckets.take("u1", 3)
+    clock[0] += 3600
+    for _ in range(3):
+        assert buckets.take("u1", 1) == 0
+    assert buckets.take("u1", 1) > 0
+
+
+def test_endpoint_costs():
+    assert endpoint_cost("/ai/budget-prediction") == 10
+    assert endpoint_cost("/dashboard/yearly-report") == 8
+    assert endpoint_cost("/dashboard/summary") == 3
+    assert endpoint_cost("/transactions/") == 1
+
+
+def test_limiter_rejects_beyond_the_queue():
+    async def scenario():
+        limiter = ConcurrencyLimiter(limit=1, max_queue=1, timeout=0.05)
+        assert await limiter.acquire()
+        waiting = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        # The one queue slot is taken, so the next caller is turned away at once
+        assert not await limiter.acquire()
+        # and the queued caller times out while the slot stays busy
+        assert not await waiting
+        limiter.release()
+        assert await limiter.acquire()
+
+    asyncio.run(scenario())
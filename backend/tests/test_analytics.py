@@ -0,0 +1,113 @@
+import asyncio
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("motor")
+
+from datetime import datetime
+from summary import analytics
+from summary.analytics import AnalyticsEngine
+
+
+class FakeCursor:
+    def __init__(self, documents):
+        self.documents = list(documents)
+        self.fetches = []
+
+    def batch_size(self, size):
+        return self
+
+    async def to_list(self, length):
+        batch, self.documents = self.documents[:length], self.documents[length:]
+        self.fetches.append(len(batch))
+        return batch
+
+
+class FakeTransactions:
+    def __init__(self, documents):
+        self.documents = documents
+        self.cursors = []
+
+    def find(self, query, projection, comment=None):
+        cursor = FakeCursor(document for document in self.documents if document["user_id"] == query["user_id"])
+        self.cursors.append(cursor)
+        return cursor
+
+
+class FakeDb:
+    def __init__(self, documents):
+        self.transactions = FakeTransactions(documents)
+
+
+def transaction(month, type_, category, amount, user_id="u1"):
+    return {"user_id": user_id, "date": datetime(2024, month, 15), "type": type_, "category": category, "amount": amount}
+
+
+def test_loads_in_batches_and_answers_facets(monkeypatch):
+    monkeypatch.setattr(analytics, "LOAD_BATCH", 2)
+    db = FakeDb([
+        transaction(1, "income", "Income", 1000.0),
+        transaction(1, "expense", "Food", 40.0),
+        transaction(2, "expense", "Food", 60.0),
+        transaction(2, "expense", "Travel", 200.0),
+        transaction(2, "expense", "Travel", 5.0, user_id="u2"),
+    ])
+    engine = AnalyticsEngine(memory_budget_bytes=1 << 20, max_age_seconds=60)
+
+    columns = asyncio.run(engine.columns(db, "u1"))
+    assert db.transactions.cursors[0].fetches == [2, 2, 0]
+    assert columns.size == 4
+
+    facets = columns.facets(datetime(2024, 1, 1), datetime(2024, 3, 1), ["totals", "categories", "monthly"])
+    assert facets["totals"] == [{"_id": "income", "total": 1000.0, "count": 1}, {"_id": "expense", "total": 300.0, "count": 3}]
+    assert facets["categories"] == [{"_id": "Travel", "amount": 200.0}, {"_id": "Food", "amount": 100.0}]
+    assert facets["monthly"] == [
+        {"_id": "2024-01", "income": 1000.0, "expense": 40.0},
+        {"_id": "2024-02", "income": 0.0, "expense": 260.0},
+    ]
+
+
+def test_loaded_users_are_reused_until_invalidated():
+    db = FakeDb([transaction(1, "expense", "Food", 40.0)])
+    engine = AnalyticsEngine(memory_budget_bytes=1 << 20, max_age_seconds=60)
+    asyncio.run(engine.columns(db, "u1"))
+    asyncio.run(engine.columns(db, "u1"))
+    assert len(db.transactions.cursors) == 1
+
+    engine.invalidate("u1")
+    asyncio.run(engine.columns(db, "u1"))
+    assert len(db.transactions.cursors) == 2
+
+
+class SlowCursor(FakeCursor):
+    def __init__(self, documents, started, release):
+        super().__init__(documents)
+        self.started, self.release = started, release
+
+    async def to_list(self, length):
+        self.started.set()
+        await self.release.wait()
+        return await super().to_list(length)
+
+
+def test_a_timed_out_caller_does_not_cancel_a_shared_load():
+    async def scenario():
+        started, release = asyncio.Event(), asyncio.Event()
+        db = FakeDb([transaction(1, "expense", "Food", 40.0)])
+        db.transactions.find = lambda query, projection, comment=None: SlowCursor(db.transactions.documents, started, release)
+        engine = AnalyticsEngine(memory_budget_bytes=1 << 20, max_age_seconds=60)
+
+        first = asyncio.create_task(asyncio.wait_for(engine.columns(db, "u1"), timeout=0.05))
+        await started.wait()
+        second = asyncio.create_task(engine.columns(db, "u1"))
+        with pytest.raises(asyncio.TimeoutError):
+            await first
+
+        release.set()
+        columns = await second
+        assert columns.size == 1
+        # The load finished for everyone and was kept
+        assert (await engine.columns(db, "u1")) is columns
+        assert not engine._loading
+
+    asyncio.run(scenario())
@@ -0,0 +1,44 @@
+import time
+from utils.cache import TTLCache
+
+
+def test_evicts_the_least_recently_used():
+    cache = TTLCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+
+
+def test_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    cache = TTLCache(maxsize=10, ttl=30)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=120)
+    now[0] += 31
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    now[0] += 90
+    assert cache.get("b") is None
+
+
+def test_falsy_values_are_hits():
+    cache = TTLCache()
+    cache.set("zero", 0)
+    assert cache.get("zero", "missing") == 0
+
+
+def test_pop_where_and_stats():
+    cache = TTLCache()
+    for n in range(4):
+        cache.set(n, {"user": n % 2})
+    assert cache.pop_where(lambda value: value["user"] == 1) == 2
+    assert cache.get(1) is None
+    assert cache.pop(0) == {"user": 0}
+    stats = cache.stats()
+    assert (stats["size"], stats["hits"], stats["misses"]) == (1, 0, 1)
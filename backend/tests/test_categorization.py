@@ -0,0 +1,56 @@
+import pytest
+
+pytest.importorskip("sklearn")
+bson = pytest.importorskip("bson")
+
+from dataset import categorization
+
+
+class FakeCursor(list):
+    def sort(self, *args):
+        return self
+
+    def batch_size(self, size):
+        return self
+
+
+class FakeCollection:
+    """Just enough of a pymongo collection for train()"""
+
+    def __init__(self, rows):
+        self.rows = [{"_id": bson.ObjectId(), "description": description, "category": category}
+                     for description, category in rows]
+
+    def distinct(self, field, query):
+        return {row[field] for row in self.rows}
+
+    def find(self, query, projection):
+        since = query.get("_id", {}).get("$gt")
+        return FakeCursor(row for row in self.rows if since is None or row["_id"] > since)
+
+
+def test_incremental_run_with_a_subset_of_the_classes(monkeypatch):
+    first = FakeCollection([("Pharmacy", "Health"), ("Gym membership", "Health"), ("Cinema", "Entertainment")])
+    model, metadata = categorization.train(first, chunk_size=2)
+    assert metadata["mode"] == "full"
+
+    # Only Travel rows are new, and Health no longer appears in distinct()
+    later = FakeCollection([("Taxi to airport", "Travel"), ("Train ticket", "Travel")])
+    later.distinct = lambda field, query: {"Travel"}
+    metadata["last_id"] = None
+    monkeypatch.setattr(categorization, "load_previous", lambda: (model, metadata))
+
+    retrained, after = categorization.train(later, incremental=True)
+    assert after["mode"] == "incremental"
+    assert after["classes"] == metadata["classes"]
+    assert retrained.predict(["Taxi to airport"])[0] == "Travel"
+
+
+def test_new_category_forces_a_full_retrain(monkeypatch):
+    model, metadata = categorization.train(FakeCollection([("Cinema", "Entertainment")]))
+    metadata["last_id"] = None
+    monkeypatch.setattr(categorization, "load_previous", lambda: (model, metadata))
+
+    _, after = categorization.train(FakeCollection([("Vet visit", "Pets")]), incremental=True)
+    assert after["mode"] == "full"
+    assert "Pets" in after["classes"]
@@ -0,0 +1,119 @@
+"""
+Unit tests for resolving users from change events, plus an end-to-end run
+against a local single-node replica set when CHANGE_FEED_TEST_URI is set:
+
+    mongod --replSet rs0 --port 27018 --dbpath /tmp/rs0 &
+    mongosh --port 27018 --eval 'rs.initiate()'
+    CHANGE_FEED_TEST_URI=mongodb://localhost:27018/?directConnection=true python -m pytest tests/test_change_feed.py
+"""
+import asyncio
+import os
+import pytest
+
+pytest.importorskip("motor")
+
+from bson import ObjectId
+from utils.change_feed import ChangeFeed
+
+
+def event(operation, collection, document_id, full=None, before=None):
+    change = {"operationType": operation, "ns": {"db": "test", "coll": collection}, "documentKey": {"_id": document_id}}
+    if full is not None:
+        change["fullDocument"] = full
+    if before is not None:
+        change["fullDocumentBeforeChange"] = before
+    return change
+
+
+def test_users_events_name_the_user_from_the_document_key():
+    user_id = ObjectId()
+    assert ChangeFeed().user_for(event("update", "users", user_id)) == str(user_id)
+
+
+def test_delete_without_pre_image_uses_the_owner_seen_earlier():
+    feed, transaction_id = ChangeFeed(), ObjectId()
+    assert feed.user_for(event("insert", "transactions", transaction_id, full={"user_id": "u1"})) == "u1"
+    assert feed.user_for(event("delete", "transactions", transaction_id, full={}, before={})) == "u1"
+    # The owner is forgotten with the document
+    assert feed.user_for(event("delete", "transactions", transaction_id, full={}, before={})) is None
+
+
+def test_delete_with_pre_image():
+    feed = ChangeFeed()
+    assert feed.user_for(event("delete", "budgets", ObjectId(), full={}, before={"user_id": "u2"})) == "u2"
+
+
+def test_unknown_delete_means_everything():
+    assert ChangeFeed().user_for(event("delete", "transactions", ObjectId(), full={}, before={})) is None
+
+
+def test_pipeline_never_ships_user_documents():
+    full_document = ChangeFeed().pipeline()[-1]["$project"]["fullDocument"]["$switch"]
+    assert full_document["default"] == "$$REMOVE"
+    for branch in full_document["branches"]:
+        assert "users" not in str(branch["case"])
+        assert set(branch["then"]) <= {"user_id", "date", "amount", "type", "category"}
+
+
+def test_own_inserts_are_not_published_again():
+    feed, mine, theirs = ChangeFeed(), ObjectId(), ObjectId()
+    feed.mark_local([mine])
+    assert feed.is_local(event("insert", "transactions", mine, full={"user_id": "u1"}))
+    assert not feed.is_local(event("insert", "transactions", theirs, full={"user_id": "u1"}))
+    # Only the one event is swallowed
+    assert not feed.is_local(event("insert", "transactions", mine, full={"user_id": "u1"}))
+
+
+class RecordingEngine:
+    def __init__(self):
+        self.calls = []
+
+    def append(self, user_id, documents):
+        self.calls.append(("append", user_id, documents))
+
+    def invalidate(self, user_id):
+        self.calls.append(("invalidate", user_id))
+
+
+def test_inserts_extend_loaded_columns_and_edits_invalidate(monkeypatch):
+    main = pytest.importorskip("main")
+    engine = RecordingEngine()
+    monkeypatch.setattr(main, "analytics_engine", engine)
+    row = {"user_id": "u1", "date": "2025-01-01", "amount": 5.0, "type": "expense", "category": "Food"}
+
+    asyncio.run(main.invalidate_caches("u1", "transactions", event("insert", "transactions", ObjectId(), full=row)))
+    asyncio.run(main.invalidate_caches("u1", "transactions", event("update", "transactions", ObjectId(), full=row)))
+    asyncio.run(main.invalidate_caches("u1", "budgets", event("insert", "budgets", ObjectId(), full={"user_id": "u1"})))
+    assert engine.calls == [("append", "u1", [row]), ("invalidate", "u1")]
+
+
+@pytest.mark.skipif(not os.getenv("CHANGE_FEED_TEST_URI"), reason="needs a replica set in CHANGE_FEED_TEST_URI")
+def test_end_to_end_on_a_replica_set():
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    async def scenario():
+        client = AsyncIOMotorClient(os.environ["CHANGE_FEED_TEST_URI"])
+        db = client[f"change_feed_test_{ObjectId()}"]
+        await db.create_collection("transactions")
+        await db.create_collection("users")
+        feed, seen = ChangeFeed(), []
+        feed.subscribe(lambda user_id, collection, change: seen.append((user_id, collection)))
+        task = asyncio.create_task(feed.run(db))
+        try:
+            await asyncio.sleep(1)
+            user = await db.users.insert_one({"email": "a@example.com", "hashed_password": "secret"})
+            result = await db.transactions.insert_one({"user_id": "u1", "amount": 5})
+            await db.transactions.update_one({"_id": result.inserted_id}, {"$set": {"amount": 6}})
+            await db.transactions.delete_one({"_id": result.inserted_id})
+            for _ in range(50):
+                if len(seen) >= 4:
+                    break
+                await asyncio.sleep(0.1)
+        finally:
+            task.cancel()
+            await client.drop_database(db.name)
+            client.close()
+        return str(user.inserted_id), seen
+
+    user_id, seen = asyncio.run(scenario())
+    assert seen == [(user_id, "users"), ("u1", "transactions"), ("u1", "transactions"), ("u1", "transactions")]
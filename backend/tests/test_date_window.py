@@ -0,0 +1,34 @@
+import pytest
+from datetime import datetime
+from utils.date_window import month_count, month_keys, month_window
+
+
+def test_month_keys_cross_year_boundaries():
+    assert month_keys("2024-11", "2025-02") == ["2024-11", "2024-12", "2025-01", "2025-02"]
+
+
+def test_month_keys_normalise_single_digit_months():
+    assert month_keys("2025-1", "2025-2") == ["2025-01", "2025-02"]
+
+
+def test_month_count_matches_month_keys():
+    for first, last in [("2025-03", "2025-03"), ("2024-11", "2025-02"), ("2015-01", "2024-12")]:
+        assert month_count(first, last) == len(month_keys(first, last))
+
+
+def test_month_count_of_a_huge_range_is_arithmetic():
+    assert month_count("0001-01", "9999-12") == 9999 * 12
+
+
+def test_month_count_of_a_reversed_range_is_not_positive():
+    assert month_count("2025-05", "2025-01") <= 0
+    assert month_keys("2025-05", "2025-01") == []
+
+
+def test_month_count_rejects_bad_months():
+    with pytest.raises(ValueError):
+        month_count("2025-13", "2025-12")
+
+
+def test_month_window():
+    assert month_window("2024-12") == (datetime(2024, 12, 1), datetime(2025, 1, 1))
@@ -0,0 +1,56 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from predictions.forecasting import forecast, fit_trend, month_index, index_month
+
+
+def rows_for(category, totals, first="2024-01"):
+    start = month_index(first)
+    return [{"month": index_month(start + m), "category": category, "total": total} for m, total in enumerate(totals)]
+
+
+def test_trend_errors_are_one_step_ahead():
+    y = np.array([[10.0, 20.0, 30.0, 40.0, 100.0]])
+    prediction, errors = fit_trend(y)
+    # A perfect line so far forecasts each next month exactly; the jump at the end is all error
+    assert errors[0, 2] == pytest.approx(0)
+    assert errors[0, 3] == pytest.approx(0)
+    assert errors[0, 4] == pytest.approx(50)
+
+
+def test_linear_growth_picks_the_trend():
+    rows = rows_for("Rent", [100 + 10 * m for m in range(12)])
+    result = forecast(rows, month_index("2025-01"))
+    assert result["categories"]["Rent"]["method"] == "trend"
+    assert result["categories"]["Rent"]["prediction"] == pytest.approx(220)
+
+
+def test_noisy_flat_spending_is_not_overfit_by_the_trend():
+    # The in-sample line fits this as well as smoothing, but it forecasts worse one step ahead
+    rows = rows_for("Food", [100, 140, 60, 150, 50, 145, 55, 150, 50, 140, 60, 100])
+    result = forecast(rows, month_index("2025-01"))
+    assert result["categories"]["Food"]["method"] == "smoothing"
+
+
+def test_seasonal_pattern_picks_seasonal():
+    year = [50, 50, 50, 50, 50, 50, 50, 50, 50, 50, 400, 600]
+    rows = rows_for("Gifts", year * 3)
+    result = forecast(rows, month_index("2026-12"))
+    assert result["categories"]["Gifts"]["method"] == "seasonal"
+    assert result["categories"]["Gifts"]["prediction"] == pytest.approx(600)
+
+
+def test_labels_the_requested_month_and_counts_quiet_months_as_zero():
+    rows = rows_for("Travel", [300, 300, 300], first="2024-01")
+    result = forecast(rows, month_index("2024-07"))
+    assert result["month"] == "2024-07"
+    assert result["history_months"] == 6
+
+
+def test_defaults_to_the_calendar_month_after_today():
+    from datetime import datetime
+    today = datetime.utcnow()
+    rows = rows_for("Travel", [300, 300], first=index_month(today.year * 12 + today.month - 3))
+    expected = index_month(today.year * 12 + today.month)
+    assert forecast(rows)["month"] == expected
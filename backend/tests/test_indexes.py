@@ -0,0 +1,63 @@
+import asyncio
+import pytest
+
+pytest.importorskip("pymongo")
+
+from pymongo.errors import OperationFailure
+import indexes
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = rows
+
+    async def to_list(self, length):
+        return self.rows
+
+
+class FakeCollection:
+    def __init__(self, name, duplicates):
+        self.name = name
+        self.duplicates = duplicates
+
+    async def index_information(self):
+        return {"_id_": {}}
+
+    async def create_indexes(self, models):
+        name = models[0].document["name"]
+        if models[0].document.get("unique") and self.duplicates:
+            raise OperationFailure("E11000 duplicate key error", code=11000)
+        return [name]
+
+    def aggregate(self, pipeline, allowDiskUse=False):
+        return FakeCursor(self.duplicates)
+
+
+class FakeDb:
+    def __init__(self, duplicates):
+        self.collections = {name: FakeCollection(name, duplicates.get(name, [])) for name in indexes.INDEXES}
+
+    def __getitem__(self, name):
+        return self.collections[name]
+
+
+def test_duplicates_skip_the_unique_index_instead_of_failing_startup(caplog):
+    db = FakeDb({"users": [{"_id": {"email": "a@example.com"}, "count": 2, "ids": [1, 2]}]})
+    skipped = asyncio.run(indexes.ensure_indexes(db))
+    assert skipped == ["users.email"]
+    assert "python -m indexes --duplicates" in caplog.text
+    assert "a@example.com" in caplog.text
+
+
+def test_clean_collections_build_everything():
+    assert asyncio.run(indexes.ensure_indexes(FakeDb({}))) == []
+
+
+def test_other_index_errors_still_raise():
+    db = FakeDb({})
+
+    async def broken(models):
+        raise OperationFailure("bad spec", code=67)
+    db["budgets"].create_indexes = broken
+    with pytest.raises(OperationFailure):
+        asyncio.run(indexes.ensure_indexes(db))
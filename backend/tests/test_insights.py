@@ -0,0 +1,49 @@
+import asyncio
+import pytest
+
+pytest.importorskip("numpy")
+
+from datetime import datetime, timedelta
+from predictions.forecasting import next_month, index_month
+from predictions.insights import load_fresh_insights
+
+
+class FakeCollection:
+    def __init__(self, document=None):
+        self.document = document
+
+    async def find_one(self, query, projection=None):
+        return self.document
+
+
+class FakeDb:
+    def __init__(self, insights):
+        self.insights = FakeCollection(insights)
+        self.monthly_rollups = FakeCollection()
+
+
+def stored(month, hours_old=1):
+    return {
+        "user_id": "u1",
+        "computed_at": datetime.utcnow() - timedelta(hours=hours_old),
+        "budget_prediction": {"month": month, "next_month_expense_prediction": 100.0}
+    }
+
+
+def test_serves_insights_forecasting_next_month():
+    insights = stored(index_month(next_month()))
+    assert asyncio.run(load_fresh_insights(FakeDb(insights), "u1")) is insights
+
+
+def test_forecast_for_the_current_month_is_stale():
+    # Computed just before the month turned over
+    assert asyncio.run(load_fresh_insights(FakeDb(stored(index_month(next_month() - 1))), "u1")) is None
+
+
+def test_insights_without_a_forecast_are_served():
+    insights = {**stored(None), "budget_prediction": None}
+    assert asyncio.run(load_fresh_insights(FakeDb(insights), "u1")) is insights
+
+
+def test_old_insights_are_stale():
+    assert asyncio.run(load_fresh_insights(FakeDb(stored(index_month(next_month()), hours_old=1000)), "u1")) is None
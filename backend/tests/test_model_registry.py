@@ -0,0 +1,39 @@
+import asyncio
+import os
+import pytest
+
+joblib = pytest.importorskip("joblib")
+
+from transaction.model_registry import ModelRegistry
+
+
+@pytest.fixture
+def artifact(tmp_path):
+    path = str(tmp_path / "model.pkl")
+    joblib.dump({"version": 1}, path)
+    return path
+
+
+def test_watcher_does_not_load_before_first_use(artifact):
+    registry = ModelRegistry(artifact, mmap=False)
+    assert asyncio.run(registry.reload_if_changed()) is False
+    assert registry.model is None
+
+    assert registry.get() == {"version": 1}
+
+
+def test_watcher_swaps_a_changed_artifact_and_notifies(artifact):
+    registry = ModelRegistry(artifact, mmap=False)
+    registry.get()
+    reloads = []
+    registry.on_reload(lambda: reloads.append(registry.version))
+    assert asyncio.run(registry.reload_if_changed()) is False
+
+    joblib.dump({"version": 2}, artifact)
+    # Make sure the stamp changes even on coarse filesystem clocks
+    stat = os.stat(artifact)
+    os.utime(artifact, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    assert asyncio.run(registry.reload_if_changed()) is True
+    assert registry.get() == {"version": 2}
+    assert reloads == [registry.version]
@@ -0,0 +1,35 @@
+import pytest
+
+bson = pytest.importorskip("bson")
+
+from datetime import datetime
+from utils.pagination import encode_cursor, decode_cursor, after_cursor
+
+
+def test_round_trips_datetime_dates():
+    _id = bson.ObjectId()
+    date = datetime(2025, 3, 14, 9, 26, 53)
+    assert decode_cursor(encode_cursor({"date": date, "_id": _id})) == (date, _id)
+
+
+def test_keeps_legacy_string_dates_as_strings():
+    _id = bson.ObjectId()
+    assert decode_cursor(encode_cursor({"date": "2021-06-01", "_id": _id})) == ("2021-06-01", _id)
+
+
+def test_datetime_cursor_continues_into_string_dates():
+    _id = bson.ObjectId()
+    query = after_cursor({"user_id": "u"}, encode_cursor({"date": datetime(2025, 1, 1), "_id": _id}))
+    assert query["user_id"] == "u"
+    assert {"date": {"$type": "string"}} in query["$or"]
+
+
+def test_string_cursor_stays_within_string_dates():
+    _id = bson.ObjectId()
+    query = after_cursor({}, encode_cursor({"date": "2021-06-01", "_id": _id}))
+    assert query["$or"] == [{"date": {"$lt": "2021-06-01"}}, {"date": "2021-06-01", "_id": {"$lt": _id}}]
+
+
+def test_rejects_garbage():
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
@@ -0,0 +1,44 @@
+import asyncio
+import pytest
+
+pytest.importorskip("motor")
+pytest.importorskip("fastapi")
+
+import database
+from utils.response_cache import InProcessBackend, ResponseCache
+
+PRIMARY, ANALYTICS = object(), object()
+
+
+@pytest.fixture
+def shared_backend(monkeypatch):
+    """One backend seen by two workers' response caches, as a Redis backend would be"""
+    backend = InProcessBackend(maxsize=100, ttl=600)
+    monkeypatch.setattr(database, "response_cache", ResponseCache(backend))
+    monkeypatch.setattr(database, "recent_writers", database.TTLCache(maxsize=100, ttl=60))
+    database.use_database(PRIMARY, ANALYTICS)
+    yield backend
+    database.close()
+
+
+def test_reads_go_to_the_analytics_handle_by_default(shared_backend):
+    assert asyncio.run(database.get_analytics_db("u1")) is ANALYTICS
+    assert asyncio.run(database.get_analytics_db()) is ANALYTICS
+
+
+def test_own_writes_read_from_the_primary(shared_backend):
+    database.record_write("u1")
+    assert asyncio.run(database.get_analytics_db("u1")) is PRIMARY
+    assert asyncio.run(database.get_analytics_db("u2")) is ANALYTICS
+
+
+def test_another_workers_write_reads_from_the_primary(shared_backend):
+    other_worker = ResponseCache(shared_backend)
+    asyncio.run(other_worker.bump("u1"))
+    assert asyncio.run(database.get_analytics_db("u1")) is PRIMARY
+
+
+def test_old_bumps_fall_back_to_the_analytics_handle(shared_backend, monkeypatch):
+    asyncio.run(ResponseCache(shared_backend).bump("u1"))
+    monkeypatch.setattr(database, "READ_YOUR_WRITES_SECONDS", 0)
+    assert asyncio.run(database.get_analytics_db("u1")) is ANALYTICS
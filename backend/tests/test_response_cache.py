@@ -0,0 +1,38 @@
+import asyncio
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("orjson")
+
+from utils.response_cache import InProcessBackend
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_bump_changes_the_version():
+    backend = InProcessBackend(maxsize=10, ttl=60)
+    before = run(backend.get_version("u1"))
+    assert run(backend.get_version("u1")) == before
+    run(backend.bump("u1"))
+    assert run(backend.get_version("u1")) != before
+
+
+def test_versions_are_bounded():
+    backend = InProcessBackend(maxsize=3, ttl=60)
+    for n in range(10):
+        run(backend.bump(f"u{n}"))
+    assert len(backend.versions) == 3
+
+
+def test_evicted_version_is_never_reused():
+    backend = InProcessBackend(maxsize=2, ttl=60)
+    seen = {run(backend.get_version("u1"))}
+    run(backend.bump("u1"))
+    seen.add(run(backend.get_version("u1")))
+
+    # u1 falls out of the LRU; its next version must not match any key cached before
+    run(backend.bump("u2"))
+    run(backend.bump("u3"))
+    assert run(backend.get_version("u1")) not in seen
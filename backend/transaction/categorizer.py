@@ -0,0 +1,202 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from config import CATEGORIZER_MAX_BATCH_SIZE, CATEGORIZER_MAX_WAIT_MS, CATEGORIZER_EXECUTOR, CATEGORIZER_WORKERS, CATEGORY_CACHE_SIZE
+from utils.cache import TTLCache
+from utils.metrics import Gauge, Histogram
+from .model_registry import model_registry
+import asyncio
+import joblib
+import re
+import time
+
+
+batch_size_histogram = Histogram(
+    "categorizer_batch_size", "Descriptions per model.predict call",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 1024, 4096)
+)
+latency_histogram = Histogram(
+    "categorizer_latency_seconds", "Time from predict request to result, including batching wait"
+)
+predict_histogram = Histogram(
+    "categorizer_predict_seconds", "Time spent in one model.predict batch"
+)
+
+
+def normalize_description(description):
+    # Case and spacing never change the prediction, so they share one cache entry
+    return re.sub(r"\s+", " ", description).strip().lower()
+
+
+# Process-pool workers load their own copy of the model once
+_worker_model = None
+
+def _init_worker(model_path, mmap):
+    global _worker_model
+    _worker_model = joblib.load(model_path, mmap_mode="r" if mmap else None)
+
+def _predict_in_worker(descriptions):
+    return [str(category) for category in _worker_model.predict(descriptions)]
+
+
+class Categorizer:
+    """
+    Collects concurrent predict requests for up to max_wait_ms and runs them as one
+    vectorised model.predict call off the event loop, resolving each caller's future.
+    """
+
+    def __init__(self, registry, max_batch_size=CATEGORIZER_MAX_BATCH_SIZE, max_wait_ms=CATEGORIZER_MAX_WAIT_MS,
+                 executor=CATEGORIZER_EXECUTOR, workers=CATEGORIZER_WORKERS):
+        self.registry = registry
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.executor_kind = executor
+        self.workers = workers
+        self._executor = None
+        self._pending = []
+        self._timer = None
+        # Normalised description -> category for the currently loaded model
+        self.cache = TTLCache(maxsize=CATEGORY_CACHE_SIZE)
+        self.item_cost = 0.0
+        self.saved_seconds = 0.0
+        # Bumped on reload so in-flight batches from the old model are not cached
+        self.generation = 0
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self.executor_kind == "process":
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, initializer=_init_worker, initargs=(self.registry.path, self.registry.mmap)
+                )
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="categorizer")
+        return self._executor
+
+    def reload(self):
+        """Called when the registry swaps in a new model: recycle the worker pool and drop cached predictions"""
+        executor, self._executor = self._executor, None
+        self.generation += 1
+        self.cache.clear()
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def _cached(self, key):
+        category = self.cache.get(key)
+        if category is not None:
+            self.saved_seconds += self.item_cost
+        return category
+
+    def _predict(self, descriptions):
+        return [str(category) for category in self.registry.get().predict(descriptions)]
+
+    async def _run(self, descriptions):
+        executor = self._get_executor()
+        generation = self.generation
+        fn = _predict_in_worker if self.executor_kind == "process" else self._predict
+        start = time.perf_counter()
+        categories = await asyncio.get_running_loop().run_in_executor(executor, fn, descriptions)
+        elapsed = time.perf_counter() - start
+        predict_histogram.observe(elapsed)
+        batch_size_histogram.observe(len(descriptions))
+        # Running per-description cost, used to estimate the time cache hits save
+        self.item_cost = 0.9 * self.item_cost + 0.1 * (elapsed / len(descriptions)) if self.item_cost else elapsed / len(descriptions)
+        if generation == self.generation:
+            for description, category in zip(descriptions, categories):
+                self.cache.set(normalize_description(description), category)
+        return categories
+
+    async def predict(self, description):
+        """Category for one description, from the cache or batched with concurrent callers"""
+        category = self._cached(normalize_description(description))
+        if category is not None:
+            return category
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((description, future, time.perf_counter()))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    async def predict_many(self, descriptions):
+        """Categories for an already-batched list (bulk import), in one predict call"""
+        categories = [self._cached(normalize_description(description)) for description in descriptions]
+        misses = [index for index, category in enumerate(categories) if category is None]
+        if not misses:
+            return categories
+
+        start = time.perf_counter()
+        predicted = await self._run([descriptions[index] for index in misses])
+        latency_histogram.observe(time.perf_counter() - start)
+        for index, category in zip(misses, predicted):
+            categories[index] = category
+        return categories
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            asyncio.ensure_future(self._resolve(batch))
+
+    async def _resolve(self, batch):
+        try:
+            categories = await self._run([description for description, _, _ in batch])
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        now = time.perf_counter()
+        for (_, future, queued_at), category in zip(batch, categories):
+            latency_histogram.observe(now - queued_at)
+            if not future.done():
+                future.set_result(category)
+
+    def stats(self):
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "executor": self.executor_kind,
+            "pending": len(self._pending),
+            "model": self.registry.info(),
+            "cache": self.cache.stats(),
+            "estimated_saved_seconds": round(self.saved_seconds, 4),
+            "batch_size": batch_size_histogram.snapshot(),
+            "latency_seconds": latency_histogram.snapshot(),
+            "predict_seconds": predict_histogram.snapshot()
+        }
+
+
+categorizer = Categorizer(model_registry)
+model_registry.on_reload(categorizer.reload)
+
+Gauge("categorizer_cache_hit_rate", "Share of categorisations served from the description cache",
+      callback=lambda: categorizer.cache.stats()["hit_rate"])
+Gauge("categorizer_saved_seconds", "Estimated model time saved by description cache hits",
+      callback=lambda: categorizer.saved_seconds)
+
+
+# Per-user learned overrides: a category the user picked for a description wins over the model
+
+async def learn_override(db, user_id, description, category):
+    await db.category_overrides.update_one(
+        {"user_id": user_id, "description_key": normalize_description(description)},
+        {"$set": {"category": category, "updated_at": datetime.utcnow()}},
+        upsert=True
+    )
+
+
+async def find_overrides(db, user_id, descriptions):
+    """Normalised description -> category for every override the user has for these descriptions"""
+    keys = list({normalize_description(description) for description in descriptions})
+    overrides = await db.category_overrides.find(
+        {"user_id": user_id, "description_key": {"$in": keys}},
+        {"_id": 0, "description_key": 1, "category": 1}
+    ).to_list(None)
+    return {override["description_key"]: override["category"] for override in overrides}
@@ -0,0 +1,62 @@
+from datetime import datetime
+import csv
+import io
+import json
+import re
+
+
+# Parsers for /transactions/bulk. Each returns a list of raw row dicts that are
+# validated against the Transaction model by the route.
+
+def parse_json(body: bytes):
+    rows = json.loads(body)
+    if isinstance(rows, dict):
+        rows = rows.get("transactions", [])
+    if not isinstance(rows, list):
+        raise ValueError("Expected a JSON array of transactions")
+    return rows
+
+
+def parse_csv(body: bytes):
+    """CSV with a header row: amount, type, description and optional category, date"""
+    reader = csv.DictReader(io.StringIO(body.decode("utf-8-sig")))
+    rows = []
+    for row in reader:
+        row = {key.strip().lower(): (value or "").strip() for key, value in row.items() if key}
+        if not row.get("category"):
+            row.pop("category", None)
+        if not row.get("date"):
+            row.pop("date", None)
+        rows.append(row)
+    return rows
+
+
+OFX_TRANSACTION = re.compile(r"<STMTTRN>(.*?)</STMTTRN>", re.S | re.I)
+OFX_FIELD = re.compile(r"<(\w+)>([^<\r\n]*)")
+
+
+def parse_ofx(body: bytes):
+    """Bank statement transactions from an OFX (SGML or XML) file"""
+    rows = []
+    for block in OFX_TRANSACTION.findall(body.decode("utf-8", errors="replace")):
+        fields = {name.upper(): value.strip() for name, value in OFX_FIELD.findall(block)}
+        amount = float(fields.get("TRNAMT", "0"))
+        row = {
+            "amount": abs(amount),
+            "type": "income" if amount > 0 else "expense",
+            "description": fields.get("NAME") or fields.get("MEMO") or ""
+        }
+        posted = fields.get("DTPOSTED", "")[:8]
+        if posted:
+            row["date"] = datetime.strptime(posted, "%Y%m%d")
+        rows.append(row)
+    return rows
+
+
+def parse_upload(content_type: str, body: bytes):
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    if content_type in ("text/csv", "application/csv"):
+        return parse_csv(body)
+    if content_type in ("application/x-ofx", "application/ofx", "text/ofx"):
+        return parse_ofx(body)
+    return parse_json(body)
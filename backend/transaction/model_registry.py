@@ -0,0 +1,129 @@
+from config import MODEL_PATH, MODEL_MMAP
+from datetime import datetime
+from threading import Lock
+import asyncio
+import hashlib
+import joblib
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRegistry:
+    """
+    Loads the expense categoriser lazily, records its version and checksum, and
+    swaps in a newly trained artifact when the file on disk changes.
+    """
+
+    def __init__(self, path, mmap=MODEL_MMAP):
+        self.path = path
+        self.mmap = mmap
+        self.model = None
+        self.version = None
+        self.checksum = None
+        self.loaded_at = None
+        self.load_seconds = None
+        self._stamp = None
+        self._lock = Lock()
+        self._listeners = []
+
+    def on_reload(self, callback):
+        """callback() runs after a new model version replaces the current one"""
+        self._listeners.append(callback)
+
+    def _file_stamp(self):
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _metadata(self):
+        # Optional sidecar written by dataset/categorization.py
+        try:
+            with open(self.path + ".json") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _read(self):
+        """Hash and deserialise the artifact; blocking, so the watcher runs it in a thread"""
+        start = datetime.now()
+        stamp = self._file_stamp()
+        sha256 = hashlib.sha256()
+        with open(self.path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                sha256.update(block)
+
+        # mmap_mode keeps large numpy arrays out of the private heap of every worker
+        model = joblib.load(self.path, mmap_mode="r" if self.mmap else None)
+        checksum = sha256.hexdigest()
+        version = self._metadata().get("version") or checksum[:12]
+        return model, version, checksum, stamp, (datetime.now() - start).total_seconds()
+
+    def _swap(self, loaded):
+        """Install a model returned by _read; returns True when it replaced a different version"""
+        model, version, checksum, stamp, load_seconds = loaded
+        previous = self.checksum
+        # Swap every attribute together so readers never mix versions
+        self.model, self.version, self.checksum, self._stamp = model, version, checksum, stamp
+        self.loaded_at = datetime.utcnow()
+        self.load_seconds = load_seconds
+        logger.info(f"Loaded categoriser model version {version} in {self.load_seconds:.3f}s")
+        return previous is not None and previous != checksum
+
+    def get(self):
+        """The current model, loaded on first use"""
+        model = self.model
+        if model is not None:
+            return model
+        with self._lock:
+            if self.model is None:
+                self._swap(self._read())
+            return self.model
+
+    def _read_if_changed(self):
+        # Nothing loaded yet: the first get() loads it, so the watcher never forces a lazy load early
+        if self.model is None or self._file_stamp() == self._stamp:
+            return None
+        return self._read()
+
+    async def reload_if_changed(self):
+        """
+        Load the artifact again if the file changed; returns True when a new version was swapped in.
+        The file is checked and read in a worker thread, but the swap and the
+        on_reload callbacks run on the event loop, next to the requests that
+        use the categoriser.
+        """
+        loaded = await asyncio.to_thread(self._read_if_changed)
+        if loaded is None:
+            return False
+        changed = self._swap(loaded)
+        if changed:
+            for callback in self._listeners:
+                callback()
+        return changed
+
+    async def warm_up(self):
+        await asyncio.to_thread(self.get)
+
+    async def watch(self, interval):
+        """Background task: poll the artifact and hot-swap new versions without restarting"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.reload_if_changed()
+            except Exception as e:
+                logger.error(f"Model reload failed, keeping version {self.version}: {str(e)}")
+
+    def info(self):
+        return {
+            "path": self.path,
+            "version": self.version,
+            "checksum": self.checksum,
+            "loaded_at": self.loaded_at,
+            "load_seconds": self.load_seconds,
+            "mmap": self.mmap
+        }
+
+
+model_registry = ModelRegistry(MODEL_PATH)
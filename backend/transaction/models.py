@@ -15,7 +15,8 @@ class Transaction(BaseModel):
     description:str
     date: datetime = Field(default_factory=datetime.now)
 
-    @field_serializer("date")
+    # JSON only, so model_dump() keeps a native datetime for Mongo
+    @field_serializer("date", when_used="json")
     def serialize_date(self, date: datetime, _info):
         return date.strftime("%Y-%m-%d")  
 
@@ -1,13 +1,25 @@
-from fastapi import HTTPException,status,APIRouter,Depends
+from fastapi import HTTPException,status,APIRouter,Depends,Query,Request
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordBearer
 from defendecies import get_current_user
+from internal import router as internal_router
 from .models import Transaction
-from database import get_db
-from utils.serializer import serialize_documents,serialize_document
+from .importers import parse_upload
+from .categorizer import categorizer,learn_override,find_overrides,normalize_description
+from database import get_db, record_write
+from utils.serializer import DocumentResponse,to_json_line
+from utils.pagination import SORT,after_cursor,encode_cursor
+from config import TRANSACTION_PAGE_SIZE,TRANSACTION_MAX_PAGE_SIZE,BULK_MAX_ROWS,BULK_MAX_BYTES,BULK_INSERT_CHUNK,CATEGORY_OVERRIDES_ENABLED
+from summary import rollups
+from summary.analytics import analytics_engine
+from utils.response_cache import response_cache
+from utils.change_feed import change_feed
 from typing import Optional
 from datetime import datetime
-import joblib
 from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
+from pydantic import ValidationError
 
 
 
@@ -17,7 +29,6 @@ router = APIRouter()
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
-model = joblib.load("expense_categorizer.pkl")
 
 
 @router.post("/add")
@@ -27,16 +38,31 @@ async def add_transaction(transaction: Transaction, token: str = Depends(oauth2_
         user = await get_current_user(token)
 
         transaction_data = transaction.dict()
-
-        if not transaction_data.get("category"):
-            transaction_data["category"] = model.predict([transaction_data["description"]])[0]
-
         transaction_data["user_id"] = str(user["_id"])
 
+        # category_source keeps model guesses out of the categoriser's training labels
+        transaction_data["category_source"] = "user"
+        if transaction_data.get("category"):
+            if CATEGORY_OVERRIDES_ENABLED:
+                await learn_override(db, transaction_data["user_id"], transaction_data["description"], transaction_data["category"])
+        else:
+            if CATEGORY_OVERRIDES_ENABLED:
+                overrides = await find_overrides(db, transaction_data["user_id"], [transaction_data["description"]])
+                transaction_data["category"] = overrides.get(normalize_description(transaction_data["description"]))
+            if not transaction_data.get("category"):
+                transaction_data["category"] = await categorizer.predict(transaction_data["description"])
+                transaction_data["category_source"] = "model"
+
         result = await db.transactions.insert_one(transaction_data)
         if not result.inserted_id:
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Transaction addition failed")
 
+        await rollups.apply_updates(db, rollups.transaction_updates(transaction_data))
+        analytics_engine.append(transaction_data["user_id"], [transaction_data])
+        change_feed.mark_local([result.inserted_id])
+        record_write(transaction_data["user_id"])
+        await response_cache.bump(transaction_data["user_id"])
+
         return {
             "message": "Transaction added successfully",
             "transaction_id": str(result.inserted_id)
@@ -46,72 +72,143 @@ async def add_transaction(transaction: Transaction, token: str = Depends(oauth2_
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Error: {str(e)}")
 
 
-@router.get("/transactions/")
-async def get_transactions(token: str = Depends(oauth2_scheme)):
+async def read_body(request: Request, limit: int):
+    """The request body, refused with 413 as soon as it is known to exceed `limit` bytes"""
+    too_large = HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=f"Upload larger than {limit} bytes")
+    length = request.headers.get("content-length")
+    if length and length.isdigit() and int(length) > limit:
+        raise too_large
+    # Content-Length can be absent (chunked) or wrong, so count while reading too
+    body = bytearray()
+    async for chunk in request.stream():
+        body.extend(chunk)
+        if len(body) > limit:
+            raise too_large
+    return bytes(body)
+
+
+@router.post("/transactions/bulk")
+async def bulk_add_transactions(request: Request, token: str = Depends(oauth2_scheme)):
+    """Import a JSON array, CSV or OFX statement; bad rows are reported without failing the batch"""
     try:
         db = get_db()
         user = await get_current_user(token)
+        user_id = str(user["_id"])
+
+        rows = parse_upload(request.headers.get("content-type"), await read_body(request, BULK_MAX_BYTES))
+        if len(rows) > BULK_MAX_ROWS:
+            raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=f"At most {BULK_MAX_ROWS} rows per import")
+
+        errors = []
+        documents = []
+        row_numbers = []
+        for index, row in enumerate(rows):
+            try:
+                documents.append(Transaction(**row).dict())
+                row_numbers.append(index)
+            except (ValidationError, TypeError) as e:
+                errors.append({"row": index, "error": str(e)})
+
+        # Learned overrides first, then every remaining row in a single predict call
+        uncategorised = [document for document in documents if not document.get("category")]
+        if uncategorised and CATEGORY_OVERRIDES_ENABLED:
+            overrides = await find_overrides(db, user_id, [document["description"] for document in uncategorised])
+            for document in uncategorised:
+                document["category"] = overrides.get(normalize_description(document["description"]))
+            uncategorised = [document for document in uncategorised if not document["category"]]
+        if uncategorised:
+            predictions = await categorizer.predict_many([document["description"] for document in uncategorised])
+            for document, category in zip(uncategorised, predictions):
+                document["category"] = category
+                document["category_source"] = "model"
+
+        for document in documents:
+            document["user_id"] = user_id
+            document.setdefault("category_source", "user")
+
+        inserted = []
+        try:
+            for offset in range(0, len(documents), BULK_INSERT_CHUNK):
+                chunk = documents[offset:offset + BULK_INSERT_CHUNK]
+                failed = set()
+                try:
+                    await db.transactions.insert_many(chunk, ordered=False)
+                except BulkWriteError as e:
+                    for write_error in e.details.get("writeErrors", []):
+                        failed.add(write_error["index"])
+                        errors.append({"row": row_numbers[offset + write_error["index"]], "error": write_error.get("errmsg")})
+                chunk_inserted = [document for index, document in enumerate(chunk) if index not in failed]
+
+                # Per chunk, so a failure in a later chunk never leaves inserted rows without rollups
+                await rollups.apply_updates(db, rollups.batch_updates(chunk_inserted))
+                analytics_engine.append(user_id, chunk_inserted)
+                change_feed.mark_local(document["_id"] for document in chunk_inserted)
+                inserted.extend(chunk_inserted)
+        finally:
+            if inserted:
+                record_write(user_id)
+                await response_cache.bump(user_id)
 
-        transactions = await db.transactions.find({"user_id": str(user["_id"])}).to_list(length=100)
-        return serialize_documents(transactions)
+        return {
+            "message": "Bulk import finished",
+            "inserted": len(inserted),
+            "failed": len(errors),
+            "errors": sorted(errors, key=lambda error: error["row"])
+        }
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Error: {str(e)}")
 
 
-@router.get("/transactions/{id}")
-async def get_transaction(id: str, token: str = Depends(oauth2_scheme)):
-    try:
-        db = get_db()
-        user = await get_current_user(token)
+@internal_router.get("/categorizer/stats")
+async def get_categorizer_stats():
+    return categorizer.stats()
 
-        transaction = await db.transactions.find_one({"_id": ObjectId(id), "user_id": str(user["_id"])})
-        if not transaction:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Transaction not found")
 
-        return serialize_document(transaction)
+async def stream_transactions(db, filters):
+    # Pipe the Motor cursor straight to the client, one document per line
+    async for document in db.transactions.find(filters).sort(SORT).batch_size(1000):
+        yield to_json_line(document)
 
-    except Exception as e:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Error: {str(e)}")
 
+async def list_transactions(db, filters, limit, cursor, format):
+    """One keyset page of transactions, or the whole matching history as NDJSON"""
+    filters = after_cursor(filters, cursor)
 
-@router.put("/transactions/update/{id}")
-async def update_transaction(id: str, updated_data: Transaction, token: str = Depends(oauth2_scheme)):
-    try:
-        db = get_db()
-        user = await get_current_user(token)
+    if format == "ndjson":
+        return StreamingResponse(stream_transactions(db, filters), media_type="application/x-ndjson")
 
-        update_result = await db.transactions.update_one(
-            {"_id": ObjectId(id), "user_id": str(user["_id"])},
-            {"$set": updated_data.dict(exclude_unset=True)}
-        )
-
-        if update_result.modified_count == 0:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Transaction not updated")
+    transactions = await db.transactions.find(filters).sort(SORT).limit(limit + 1).to_list(length=limit + 1)
+    has_more = len(transactions) > limit
+    transactions = transactions[:limit]
 
-        return {"message": "Transaction updated successfully"}
+    # Returned as a Response so the documents are encoded once, by orjson, without copies
+    return DocumentResponse({
+        "transactions": transactions,
+        "next_cursor": encode_cursor(transactions[-1]) if has_more else None
+    })
 
-    except Exception as e:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Error: {str(e)}")
 
-
-@router.delete("/transactions/delete/{id}")
-async def delete_transaction(id: str, token: str = Depends(oauth2_scheme)):
+@router.get("/transactions/")
+async def get_transactions(
+    limit: int = Query(TRANSACTION_PAGE_SIZE, ge=1, le=TRANSACTION_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    token: str = Depends(oauth2_scheme)
+):
     try:
         db = get_db()
         user = await get_current_user(token)
 
-        delete_result = await db.transactions.delete_one({"_id": ObjectId(id), "user_id": str(user["_id"])})
-
-        if delete_result.deleted_count == 0:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Transaction not found or already deleted")
-
-        return {"message": "Transaction deleted successfully"}
+        return await list_transactions(db, {"user_id": str(user["_id"])}, limit, cursor, format)
 
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Error: {str(e)}")
 
 
+# Registered before /transactions/{id} so "filter" is not captured as an id
 @router.get("/transactions/filter")
 async def filter_transactions(
     category: Optional[str] = None,
@@ -119,6 +216,9 @@ async def filter_transactions(
     max_amount: Optional[float] = None,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
+    limit: int = Query(TRANSACTION_PAGE_SIZE, ge=1, le=TRANSACTION_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
     token: str = Depends(oauth2_scheme)
 ):
     try:
@@ -144,8 +244,77 @@ async def filter_transactions(
             if end_date:
                 filters["date"]["$lte"] = end_date
 
-        transactions = await db.transactions.find(filters).to_list(length=100)
-        return serialize_documents(transactions)
+        return await list_transactions(db, filters, limit, cursor, format)
+
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Error: {str(e)}")
+
+
+@router.get("/transactions/{id}")
+async def get_transaction(id: str, token: str = Depends(oauth2_scheme)):
+    try:
+        db = get_db()
+        user = await get_current_user(token)
+
+        transaction = await db.transactions.find_one({"_id": ObjectId(id), "user_id": str(user["_id"])})
+        if not transaction:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Transaction not found")
+
+        return DocumentResponse(transaction)
+
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Error: {str(e)}")
+
+
+@router.put("/transactions/update/{id}")
+async def update_transaction(id: str, updated_data: Transaction, token: str = Depends(oauth2_scheme)):
+    try:
+        db = get_db()
+        user = await get_current_user(token)
+
+        changes = updated_data.dict(exclude_unset=True)
+        if changes.get("category"):
+            changes["category_source"] = "user"
+        old_transaction = await db.transactions.find_one_and_update(
+            {"_id": ObjectId(id), "user_id": str(user["_id"])},
+            {"$set": changes},
+            return_document=ReturnDocument.BEFORE
+        )
+
+        if not old_transaction:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Transaction not updated")
+
+        await rollups.apply_updates(db, rollups.change_updates(old_transaction, {**old_transaction, **changes}))
+        analytics_engine.invalidate(user["_id"])
+        record_write(user["_id"])
+        await response_cache.bump(user["_id"])
+
+        if CATEGORY_OVERRIDES_ENABLED and changes.get("category"):
+            await learn_override(db, str(user["_id"]), changes.get("description", old_transaction["description"]), changes["category"])
+
+        return {"message": "Transaction updated successfully"}
+
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Error: {str(e)}")
+
+
+@router.delete("/transactions/delete/{id}")
+async def delete_transaction(id: str, token: str = Depends(oauth2_scheme)):
+    try:
+        db = get_db()
+        user = await get_current_user(token)
+
+        deleted = await db.transactions.find_one_and_delete({"_id": ObjectId(id), "user_id": str(user["_id"])})
+
+        if not deleted:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Transaction not found or already deleted")
+
+        await rollups.apply_updates(db, rollups.transaction_updates(deleted, -1))
+        analytics_engine.invalidate(user["_id"])
+        record_write(user["_id"])
+        await response_cache.bump(user["_id"])
+
+        return {"message": "Transaction deleted successfully"}
 
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Error: {str(e)}")
@@ -0,0 +1,154 @@
+"""
+Admission control: shed load quickly instead of queueing until timeouts.
+
+Two checks run before a request reaches its route:
+
+- a per-user token bucket (refilled at ADMISSION_RATE tokens/s up to
+  ADMISSION_BURST), where each request costs the weight of its endpoint, so
+  one client looping on /ai or yearly reports runs dry long before someone
+  adding transactions does. Users are keyed by the JWT subject, or by client
+  IP when there is no valid token. An empty bucket returns 429.
+- a global concurrency limit for the aggregation-heavy /dashboard and /ai
+  routes. Up to ADMISSION_MAX_QUEUE requests wait, for at most
+  ADMISSION_QUEUE_TIMEOUT_SECONDS, for a slot; anything beyond that returns
+  503 straight away.
+
+Both responses carry Retry-After.
+"""
+from fastapi import Request
+from jose import jwt, JWTError
+from config import (
+    SECRET_KEY, ALGORITHM, ADMISSION_ENABLED, ADMISSION_RATE, ADMISSION_BURST, ADMISSION_MAX_CONCURRENT,
+    ADMISSION_MAX_QUEUE, ADMISSION_QUEUE_TIMEOUT_SECONDS
+)
+from utils.cache import TTLCache
+from utils.metrics import Counter, Gauge
+from utils.serializer import DocumentResponse
+import asyncio
+import math
+import time
+
+# (path prefix, cost); first match wins, everything else costs 1
+ENDPOINT_COSTS = [
+    ("/ai/", 10),
+    ("/dashboard/yearly-report", 8),
+    ("/dashboard/overview", 6),
+    ("/dashboard/", 3),
+    ("/transactions/bulk", 5),
+    ("/login", 5),
+    ("/register", 5),
+]
+
+# Routes that share the global concurrency limit
+LIMITED_PREFIXES = ("/dashboard/", "/ai/")
+
+shed_requests = Counter("admission_shed_total", "Requests rejected by admission control", labelnames=["reason"])
+
+
+def endpoint_cost(path):
+    for prefix, cost in ENDPOINT_COSTS:
+        if path.startswith(prefix):
+            return cost
+    return 1
+
+
+def client_key(request: Request):
+    authorization = request.headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        try:
+            subject = jwt.decode(authorization[7:], SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+            if subject:
+                return f"user:{subject}"
+        except JWTError:
+            pass
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+class TokenBuckets:
+    def __init__(self, rate, burst, maxsize=100000):
+        self.rate = rate
+        self.burst = burst
+        # A bucket idle long enough to refill completely is the same as a new one
+        self._buckets = TTLCache(maxsize=maxsize, ttl=burst / rate)
+
+    def take(self, key, cost):
+        """0 when admitted, otherwise seconds until `cost` tokens are available"""
+        cost = min(cost, self.burst)
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key) or (self.burst, now)
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens >= cost:
+            self._buckets.set(key, (tokens - cost, now))
+            return 0
+        self._buckets.set(key, (tokens, now))
+        return (cost - tokens) / self.rate
+
+
+class ConcurrencyLimiter:
+    """A semaphore with a bounded, timed wait queue"""
+
+    def __init__(self, limit, max_queue, timeout):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._semaphore = None
+        self.waiting = 0
+        self.running = 0
+
+    def _get_semaphore(self):
+        # Created lazily so it binds to the running loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.limit)
+        return self._semaphore
+
+    async def acquire(self):
+        semaphore = self._get_semaphore()
+        if semaphore.locked() and self.waiting >= self.max_queue:
+            return False
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self.waiting -= 1
+        self.running += 1
+        return True
+
+    def release(self):
+        self.running -= 1
+        self._get_semaphore().release()
+
+
+buckets = TokenBuckets(ADMISSION_RATE, ADMISSION_BURST)
+limiter = ConcurrencyLimiter(ADMISSION_MAX_CONCURRENT, ADMISSION_MAX_QUEUE, ADMISSION_QUEUE_TIMEOUT_SECONDS)
+Gauge("admission_queue_depth", "Requests waiting for an aggregation slot", callback=lambda: limiter.waiting)
+Gauge("admission_in_flight", "Aggregation-heavy requests running", callback=lambda: limiter.running)
+
+
+def rejected(status_code, detail, retry_after):
+    return DocumentResponse(
+        {"detail": detail}, status_code=status_code, headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+    )
+
+
+async def admission_control(request: Request, call_next):
+    path = request.url.path
+    if not ADMISSION_ENABLED or request.method == "OPTIONS":
+        return await call_next(request)
+
+    wait = buckets.take(client_key(request), endpoint_cost(path))
+    if wait:
+        shed_requests.inc(reason="rate_limited")
+        return rejected(429, "Too many requests", wait)
+
+    if not path.startswith(LIMITED_PREFIXES):
+        return await call_next(request)
+
+    if not await limiter.acquire():
+        shed_requests.inc(reason="overloaded")
+        return rejected(503, "Server busy, retry shortly", limiter.timeout)
+    try:
+        return await call_next(request)
+    finally:
+        limiter.release()
@@ -0,0 +1,194 @@
+"""
+Cross-worker cache invalidation from MongoDB change streams.
+
+Each worker tails one change stream over `transactions`, `budgets` and
+`users` and publishes (user_id, collection, change) to local subscribers,
+so in-process caches can drop a user's entries when another worker writes.
+Subscribers are plain or async callables; user_id is None when the
+affected user cannot be told from the event (see below), which means
+"drop everything", and change is None when there is no single event (a
+lost resume point).
+
+Events are projected down before they leave the server: the owner's
+user_id, plus the analytics columns of inserted transactions so other
+workers can append them. User documents, with their password hashes, are
+never shipped. A worker's own inserts are marked with mark_local and not
+published again, since the route already updated this worker's state.
+
+A delete carries no document, so its user comes from the pre-image.
+With CHANGE_STREAM_PRE_IMAGES on, the listener enables them on
+transactions and budgets at startup (MongoDB 6+; needs collMod rights):
+
+    db.runCommand({collMod: "transactions", changeStreamPreAndPostImages: {enabled: true}})
+
+Without a pre-image the owner is looked up among documents this worker has
+already seen change; only a delete of a document that was never seen falls
+back to user_id None.
+
+The resume token is kept across reconnects, so a dropped connection resumes
+where it left off; reconnects back off exponentially up to
+CHANGE_STREAM_MAX_BACKOFF_SECONDS.
+
+Change streams need a replica set. A local single-node one is enough
+(mongod --replSet rs0, then rs.initiate()); tests/test_change_feed.py runs
+against one when CHANGE_FEED_TEST_URI is set. On a standalone server the
+listener logs a warning and stops.
+"""
+from pymongo.errors import OperationFailure, PyMongoError
+from config import CHANGE_STREAM_PRE_IMAGES, CHANGE_STREAM_MAX_BACKOFF_SECONDS, CHANGE_STREAM_OWNER_CACHE_SIZE
+from utils.cache import TTLCache
+from utils.metrics import Counter
+import asyncio
+import inspect
+import logging
+
+logger = logging.getLogger(__name__)
+
+COLLECTIONS = ["transactions", "budgets", "users"]
+# Collections whose documents name their owner in user_id
+OWNED_COLLECTIONS = ["transactions", "budgets"]
+# Fields of an inserted transaction that subscribers may use (see summary/analytics.py)
+TRANSACTION_FIELDS = ["user_id", "date", "amount", "type", "category"]
+# How long a worker remembers its own inserts while waiting for their events
+LOCAL_WRITE_SECONDS = 300
+# The stream cannot resume from the stored token; events in between are lost
+RESUME_LOST_CODES = {260, 280, 286}
+# $changeStream on a standalone server
+NOT_REPLICA_SET_CODES = {40573}
+
+
+async def enable_pre_images(db):
+    """Turn on pre-images for the owned collections; False when the server or our role does not allow it"""
+    for name in OWNED_COLLECTIONS:
+        try:
+            await db.command("collMod", name, changeStreamPreAndPostImages={"enabled": True})
+        except PyMongoError as e:
+            logger.warning(f"Could not enable change stream pre-images on {name}; deletes fall back to known owners: {e}")
+            return False
+    return True
+
+
+class ChangeFeed:
+    def __init__(self, owner_cache_size=CHANGE_STREAM_OWNER_CACHE_SIZE):
+        self.subscribers = []
+        self.resume_token = None
+        # (collection, _id) -> user_id of documents seen in earlier events
+        self.owners = TTLCache(maxsize=owner_cache_size)
+        # _ids this worker inserted itself; their insert events are not published
+        self.local_inserts = TTLCache(maxsize=owner_cache_size, ttl=LOCAL_WRITE_SECONDS)
+        self.events = Counter("change_feed_events_total", "Change events received", labelnames=["collection"])
+        self.reconnects = Counter("change_feed_reconnects_total", "Change stream reconnects")
+        self.errors = Counter("change_feed_subscriber_errors_total", "Subscriber callbacks that raised")
+        self.unknown_users = Counter("change_feed_unknown_user_total", "Events whose user could not be resolved")
+
+    def subscribe(self, callback):
+        self.subscribers.append(callback)
+        return callback
+
+    def mark_local(self, document_ids):
+        """Inserts this worker has already applied to its own caches"""
+        for document_id in document_ids:
+            self.local_inserts.set(document_id, True)
+
+    def is_local(self, change):
+        return change["operationType"] == "insert" and self.local_inserts.pop(change["documentKey"]["_id"]) is not None
+
+    async def publish(self, user_id, collection, change=None):
+        for callback in self.subscribers:
+            try:
+                result = callback(user_id, collection, change)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception:
+                self.errors.inc()
+                logger.exception(f"Change feed subscriber {callback!r} failed")
+
+    def user_for(self, change):
+        collection = change["ns"]["coll"]
+        document_id = change["documentKey"]["_id"]
+        if collection == "users":
+            return str(document_id)
+
+        document = change.get("fullDocument") or change.get("fullDocumentBeforeChange") or {}
+        user_id = document.get("user_id")
+        key = (collection, document_id)
+        if change["operationType"] == "delete":
+            owner = self.owners.pop(key)
+            user_id = user_id if user_id is not None else owner
+        elif user_id is not None:
+            self.owners.set(key, user_id)
+        else:
+            # An update whose document was gone by the time it was looked up
+            user_id = self.owners.get(key)
+
+        if user_id is None:
+            self.unknown_users.inc()
+            return None
+        return str(user_id)
+
+    def pipeline(self):
+        return [
+            {"$match": {
+                "ns.coll": {"$in": COLLECTIONS},
+                "operationType": {"$in": ["insert", "update", "replace", "delete"]}
+            }},
+            # Only the owner (and a new transaction's columns) leaves the server; for users the documentKey is enough
+            {"$project": {
+                "operationType": 1,
+                "ns": 1,
+                "documentKey": 1,
+                "fullDocument": {"$switch": {
+                    "branches": [
+                        {"case": {"$eq": ["$ns.coll", "transactions"]},
+                         "then": {field: f"$fullDocument.{field}" for field in TRANSACTION_FIELDS}},
+                        {"case": {"$in": ["$ns.coll", OWNED_COLLECTIONS]}, "then": {"user_id": "$fullDocument.user_id"}}
+                    ],
+                    "default": "$$REMOVE"
+                }},
+                "fullDocumentBeforeChange": {"$cond": [
+                    {"$in": ["$ns.coll", OWNED_COLLECTIONS]}, {"user_id": "$fullDocumentBeforeChange.user_id"}, "$$REMOVE"
+                ]}
+            }}
+        ]
+
+    async def run(self, db):
+        """Tail the stream until cancelled, resuming after errors"""
+        # Updates need the looked-up document to name their user; the pipeline keeps only user_id
+        options = {"full_document": "updateLookup"}
+        if CHANGE_STREAM_PRE_IMAGES and await enable_pre_images(db):
+            options["full_document_before_change"] = "whenAvailable"
+
+        backoff = 1
+        while True:
+            try:
+                async with db.watch(self.pipeline(), resume_after=self.resume_token, **options) as stream:
+                    logger.info("Change feed listening" + (" (resumed)" if self.resume_token else ""))
+                    backoff = 1
+                    async for change in stream:
+                        collection = change["ns"]["coll"]
+                        self.events.inc(collection=collection)
+                        user_id = self.user_for(change)
+                        if not self.is_local(change):
+                            await self.publish(user_id, collection, change)
+                        self.resume_token = stream.resume_token
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                if e.code in NOT_REPLICA_SET_CODES:
+                    logger.warning("Change streams need a replica set; cross-worker invalidation is off.")
+                    return
+                if e.code in RESUME_LOST_CODES:
+                    logger.warning(f"Change stream resume point lost ({e.code}); dropping all cached state.")
+                    self.resume_token = None
+                    await self.publish(None, None)
+                else:
+                    logger.warning(f"Change stream failed: {e}")
+            except PyMongoError as e:
+                logger.warning(f"Change stream disconnected: {e}")
+
+            self.reconnects.inc()
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, CHANGE_STREAM_MAX_BACKOFF_SECONDS)
+
+
+change_feed = ChangeFeed()
@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta
+
+
+# Helpers that turn month/year/day inputs into [start, end) datetime bounds,
+# so date filters stay index range scans on the native `date` field.
+
+def month_window(month: str):
+    """'YYYY-MM' -> (first day of month, first day of next month)"""
+    start = datetime.strptime(month, "%Y-%m")
+    return start, next_month(start)
+
+
+def year_window(year: str):
+    """'YYYY' -> (Jan 1st, Jan 1st of next year)"""
+    start = datetime.strptime(year, "%Y")
+    return start, start.replace(year=start.year + 1)
+
+
+def day_window(start_date: str, end_date: str):
+    """Inclusive 'YYYY-MM-DD' bounds -> (start, day after end)"""
+    start = datetime.strptime(start_date, "%Y-%m-%d")
+    end = datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)
+    return start, end
+
+
+def next_month(date: datetime):
+    if date.month == 12:
+        return date.replace(year=date.year + 1, month=1, day=1)
+    return date.replace(month=date.month + 1, day=1)
+
+
+def date_range(start: datetime, end: datetime):
+    """Mongo filter for start <= date < end"""
+    return {"$gte": start, "$lt": end}
+
+
+def month_count(first: str, last: str):
+    """Months from first to last, inclusive (0 or less when last is before first), without building them"""
+    start, end = datetime.strptime(first, "%Y-%m"), datetime.strptime(last, "%Y-%m")
+    return (end.year - start.year) * 12 + end.month - start.month + 1
+
+
+def month_keys(first: str, last: str):
+    """Every 'YYYY-MM' from first to last, inclusive"""
+    month, end = datetime.strptime(first, "%Y-%m"), datetime.strptime(last, "%Y-%m")
+    keys = []
+    while month <= end:
+        keys.append(month.strftime("%Y-%m"))
+        month = next_month(month)
+    return keys
@@ -0,0 +1,149 @@
+"""
+Request latency and MongoDB time per route.
+
+`request_metrics` is HTTP middleware that times every request under its route
+template. `command_listener` is registered on the Mongo client and adds each
+command's duration and returned documents to the active request through a
+context variable (Motor copies the context into its executor threads). Queries
+slower than SLOW_QUERY_MS are logged with a fingerprint of the command shape,
+so the same query with different values groups together. Aggregations name
+themselves with the `comment` option, which shows up in the log and in
+`mongo_command_seconds`.
+"""
+from contextvars import ContextVar
+from threading import Lock
+from fastapi import Request
+from pymongo import monitoring
+from starlette.routing import Match
+from config import SLOW_QUERY_MS
+from utils.metrics import Counter, Histogram
+import hashlib
+import json
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+request_histogram = Histogram(
+    "http_request_duration_seconds", "Request latency by route template", labelnames=["method", "route", "status"]
+)
+request_mongo_histogram = Histogram(
+    "http_request_mongo_seconds", "MongoDB time spent per request", labelnames=["route"]
+)
+request_commands_histogram = Histogram(
+    "http_request_mongo_commands", "MongoDB commands issued per request", labelnames=["route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+)
+documents_returned = Counter(
+    "mongo_documents_returned_total", "Documents returned by MongoDB", labelnames=["route"]
+)
+command_histogram = Histogram(
+    "mongo_command_seconds", "MongoDB command latency", labelnames=["command", "collection", "comment"]
+)
+slow_queries = Counter("mongo_slow_queries_total", "Commands slower than SLOW_QUERY_MS", labelnames=["fingerprint"])
+
+current_request = ContextVar("current_request", default=None)
+
+# Fields that carry session state or payload rather than query shape
+VOLATILE_FIELDS = {"lsid", "txnNumber", "$clusterTime", "$db", "$readPreference", "documents", "comment"}
+
+
+def shape(value, keep_list=False):
+    """Query shape with every literal replaced by '?'"""
+    if isinstance(value, dict):
+        return {key: shape(item, key == "pipeline") for key, item in value.items() if key not in VOLATILE_FIELDS}
+    if isinstance(value, list):
+        if keep_list:
+            return [shape(item) for item in value]
+        return [shape(value[0])] if value and isinstance(value[0], dict) else "?"
+    return "?"
+
+
+def fingerprint(command_name, command):
+    command_shape = shape(command)
+    command_shape[command_name] = command.get(command_name) if isinstance(command.get(command_name), str) else "?"
+    text = json.dumps(command_shape, sort_keys=True)
+    return hashlib.sha1(text.encode()).hexdigest()[:12], text
+
+
+def returned_count(reply):
+    cursor = reply.get("cursor")
+    if cursor:
+        return len(cursor.get("firstBatch") or cursor.get("nextBatch") or [])
+    return int(reply.get("n", 0))
+
+
+class CommandTimer(monitoring.CommandListener):
+    def __init__(self):
+        self._lock = Lock()
+        self._pending = {}
+
+    def started(self, event):
+        command = event.command
+        collection = command.get(event.command_name)
+        if not isinstance(collection, str):
+            collection = command.get("collection", "")
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = (
+                current_request.get(), event.command_name, collection, str(command.get("comment", "")), command
+            )
+
+    def _finish(self, event, reply):
+        with self._lock:
+            pending = self._pending.pop((event.connection_id, event.request_id), None)
+        if pending is None:
+            return
+        stats, command_name, collection, comment, command = pending
+        seconds = event.duration_micros / 1e6
+        returned = returned_count(reply) if reply else 0
+
+        command_histogram.observe(seconds, command=command_name, collection=collection, comment=comment)
+        if stats is not None:
+            stats["mongo_seconds"] += seconds
+            stats["commands"] += 1
+            stats["documents"] += returned
+
+        if SLOW_QUERY_MS and seconds * 1000 >= SLOW_QUERY_MS:
+            key, text = fingerprint(command_name, command)
+            slow_queries.inc(fingerprint=key)
+            logger.warning(
+                f"Slow query {seconds * 1000:.1f}ms fingerprint={key} {command_name} {collection} "
+                f"comment={comment or '-'} route={stats['route'] if stats else '-'} returned={returned} shape={text[:500]}"
+            )
+
+    def succeeded(self, event):
+        self._finish(event, event.reply)
+
+    def failed(self, event):
+        self._finish(event, None)
+
+
+command_listener = CommandTimer()
+
+
+def route_template(request: Request):
+    """'/transactions/{id}' rather than the concrete path, so metrics stay low-cardinality"""
+    for route in request.app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+
+async def request_metrics(request: Request, call_next):
+    route = route_template(request)
+    stats = {"route": route, "mongo_seconds": 0.0, "commands": 0, "documents": 0}
+    current_request.set(stats)
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        elapsed = time.perf_counter() - start
+        response.headers["Server-Timing"] = f"app;dur={elapsed * 1000:.1f}, db;dur={stats['mongo_seconds'] * 1000:.1f}"
+        return response
+    finally:
+        request_histogram.observe(time.perf_counter() - start, method=request.method, route=route, status=status_code)
+        request_mongo_histogram.observe(stats["mongo_seconds"], route=route)
+        request_commands_histogram.observe(stats["commands"], route=route)
+        documents_returned.inc(stats["documents"], route=route)
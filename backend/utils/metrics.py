@@ -0,0 +1,137 @@
+from threading import Lock
+import bisect
+
+
+# Minimal in-process metrics; every metric registers itself in REGISTRY by name
+REGISTRY = {}
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help="", labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = Lock()
+        REGISTRY[name] = self
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self):
+        with self._lock:
+            return dict(self._values)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name, help="", labelnames=(), callback=None):
+        # callback() is read at collection time for values owned elsewhere
+        super().__init__(name, help, labelnames)
+        self.callback = callback
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def samples(self):
+        if self.callback:
+            return {(): self.callback()}
+        return super().samples()
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help="", labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+            entry["counts"][bisect.bisect_left(self.buckets, value)] += 1
+            entry["sum"] += value
+            entry["count"] += 1
+
+    def samples(self):
+        with self._lock:
+            return {key: {"counts": list(entry["counts"]), "sum": entry["sum"], "count": entry["count"]} for key, entry in self._values.items()}
+
+    def snapshot(self, **labels):
+        """Count, mean and approximate quantiles (bucket upper bounds) for one label set"""
+        entry = self.samples().get(self._key(labels))
+        if not entry or not entry["count"]:
+            return {"count": 0, "mean": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0}
+
+        def quantile(q):
+            target = q * entry["count"]
+            seen = 0
+            for index, count in enumerate(entry["counts"]):
+                seen += count
+                if seen >= target:
+                    return self.buckets[index] if index < len(self.buckets) else float("inf")
+            return float("inf")
+
+        return {
+            "count": entry["count"],
+            "mean": entry["sum"] / entry["count"],
+            "p50": quantile(0.5),
+            "p95": quantile(0.95),
+            "p99": quantile(0.99)
+        }
+
+
+def _labels(names, values, **extra):
+    pairs = list(zip(names, values)) + list(extra.items())
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def render_prometheus():
+    """Every registered metric in the Prometheus text exposition format"""
+    lines = []
+    for name, metric in sorted(REGISTRY.items()):
+        if metric.help:
+            lines.append(f"# HELP {name} {metric.help}")
+        lines.append(f"# TYPE {name} {metric.kind}")
+        for key, value in sorted(metric.samples().items()):
+            if metric.kind != "histogram":
+                lines.append(f"{name}{_labels(metric.labelnames, key)} {value}")
+                continue
+
+            cumulative = 0
+            for bound, count in zip(metric.buckets + (float("inf"),), value["counts"]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                lines.append(f"{name}_bucket{_labels(metric.labelnames, key, le=le)} {cumulative}")
+            lines.append(f"{name}_sum{_labels(metric.labelnames, key)} {value['sum']}")
+            lines.append(f"{name}_count{_labels(metric.labelnames, key)} {value['count']}")
+    return "\n".join(lines) + "\n"
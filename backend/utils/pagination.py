@@ -0,0 +1,43 @@
+from bson import ObjectId
+from datetime import datetime
+import base64
+import json
+
+
+# Keyset pagination over (date, _id), newest first
+SORT = [("date", -1), ("_id", -1)]
+
+
+def encode_cursor(document):
+    """Opaque cursor pointing just after the given document"""
+    date = document["date"]
+    # Legacy documents may still carry 'YYYY-MM-DD' strings; keep them strings so they compare as stored
+    if isinstance(date, str):
+        payload = {"s": date, "i": str(document["_id"])}
+    else:
+        payload = {"d": date.isoformat(), "i": str(document["_id"])}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        date = payload["s"] if "s" in payload else datetime.fromisoformat(payload["d"])
+        return date, ObjectId(payload["i"])
+    except Exception:
+        raise ValueError("Invalid pagination cursor")
+
+
+def after_cursor(filters: dict, cursor: str):
+    """Add the keyset condition for the page after `cursor` to a find() filter"""
+    if not cursor:
+        return filters
+    date, _id = decode_cursor(cursor)
+    conditions = [
+        {"date": {"$lt": date}},
+        {"date": date, "_id": {"$lt": _id}}
+    ]
+    # BSON orders strings below dates, so string dates follow every real date when sorting newest first
+    if not isinstance(date, str):
+        conditions.append({"date": {"$type": "string"}})
+    return {**filters, "$or": conditions}
@@ -0,0 +1,120 @@
+"""
+Per-user result cache for read-heavy dashboard and AI endpoints.
+
+Entries are keyed by endpoint, request params and the user's data version.
+Every write to a user's transactions or budgets bumps that version, so a stale
+entry can never be served; old entries simply age out. Responses carry an
+ETag and honour If-None-Match with 304, and `Cache-Control: no-cache`
+forces a recompute.
+
+The default backend is in-process. A shared backend (e.g. Redis) can be
+plugged in with RESPONSE_CACHE_BACKEND="module:factory"; the factory returns
+an object with the same async get/set/get_version/bump methods (bump_all and
+last_bump are optional). last_bump also drives read-your-writes routing in
+database.get_analytics_db, so a shared backend makes that hold across workers.
+"""
+from fastapi import Request, Response
+from config import RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL_SECONDS, RESPONSE_CACHE_BACKEND
+from utils.cache import TTLCache
+from utils.serializer import dumps
+import hashlib
+import importlib
+import itertools
+import json
+import time
+
+
+class InProcessBackend:
+    def __init__(self, maxsize, ttl):
+        self.entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        # Bounded like the entries and kept at least as long. Versions come from one
+        # counter and are never reused, so a user whose version was evicted gets a
+        # fresh one and misses instead of matching an entry from before a bump.
+        self.versions = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._next_version = itertools.count(1)
+        self.bumped_at = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def get(self, key):
+        return self.entries.get(key)
+
+    async def set(self, key, value):
+        self.entries.set(key, value)
+
+    async def get_version(self, user_id):
+        version = self.versions.get(user_id)
+        if version is None:
+            version = next(self._next_version)
+            self.versions.set(user_id, version)
+        return version
+
+    async def bump(self, user_id):
+        self.versions.set(user_id, next(self._next_version))
+        self.bumped_at.set(user_id, time.time())
+
+    async def last_bump(self, user_id):
+        return self.bumped_at.get(user_id)
+
+    async def bump_all(self):
+        self.entries.clear()
+
+    def stats(self):
+        return self.entries.stats()
+
+
+def load_backend(spec):
+    if not spec or spec == "memory":
+        return InProcessBackend(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL_SECONDS)
+    module_name, factory = spec.split(":")
+    return getattr(importlib.import_module(module_name), factory)()
+
+
+class ResponseCache:
+    def __init__(self, backend):
+        self.backend = backend
+
+    async def data_version(self, user_id):
+        """Changes whenever the user's transactions or budgets are written"""
+        return await self.backend.get_version(str(user_id))
+
+    async def bump(self, user_id):
+        """Mark everything cached for this user as stale"""
+        await self.backend.bump(str(user_id))
+
+    async def written_within(self, user_id, seconds):
+        """True when the user's data version was bumped in the last `seconds`"""
+        if not hasattr(self.backend, "last_bump"):
+            return False
+        bumped_at = await self.backend.last_bump(str(user_id))
+        return bumped_at is not None and time.time() - bumped_at < seconds
+
+    async def bump_all(self):
+        """Drop everything cached, for when the changed users are unknown"""
+        if hasattr(self.backend, "bump_all"):
+            await self.backend.bump_all()
+
+    async def serve(self, request: Request, user_id, endpoint, params, compute):
+        """Cached response for (user, endpoint, params), computing it with `await compute()` on a miss"""
+        user_id = str(user_id)
+        version = await self.backend.get_version(user_id)
+        key = f"{endpoint}:{user_id}:{version}:{json.dumps(params, sort_keys=True, default=str)}"
+
+        status = "hit"
+        entry = None
+        if "no-cache" not in request.headers.get("cache-control", ""):
+            entry = await self.backend.get(key)
+        if entry is None:
+            status = "miss"
+            body = dumps(await compute())
+            entry = {"etag": f'"{hashlib.sha1(body).hexdigest()[:20]}"', "body": body}
+            await self.backend.set(key, entry)
+
+        headers = {"ETag": entry["etag"], "X-Cache": status, "Cache-Control": "private, no-cache"}
+        if request.headers.get("if-none-match") == entry["etag"]:
+            return Response(status_code=304, headers=headers)
+        return Response(content=entry["body"], media_type="application/json", headers=headers)
+
+    def stats(self):
+        return self.backend.stats() if hasattr(self.backend, "stats") else {}
+
+
+response_cache = ResponseCache(load_backend(RESPONSE_CACHE_BACKEND))
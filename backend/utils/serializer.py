@@ -1,12 +1,44 @@
-from bson import ObjectId
+from bson import ObjectId, Decimal128
+from decimal import Decimal
+from fastapi.responses import ORJSONResponse
+import orjson
 
-# Helper function to serialize a single MongoDB document
+# Helper function to serialize a single MongoDB document (a copy; the original is left untouched)
 def serialize_document(document):
     if not document:
         return None
-    document["_id"] = str(document["_id"])  # Convert ObjectId to string
-    return document
+    return {**document, "_id": str(document["_id"])}  # Convert ObjectId to string
 
 # Helper function to serialize a list of MongoDB documents
 def serialize_documents(documents):
-    return [serialize_document(doc) for doc in documents]
\ No newline at end of file
+    return [serialize_document(doc) for doc in documents]
+
+# Types orjson does not know; datetimes, dataclasses and NumPy values are native
+def _orjson_default(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, Decimal128):
+        value = value.to_decimal()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+def dumps(content):
+    return orjson.dumps(content, default=_orjson_default, option=ORJSON_OPTIONS)
+
+# One JSON line per document for NDJSON streaming
+def to_json_line(document):
+    return dumps(document) + b"\n"
+
+
+class DocumentResponse(ORJSONResponse):
+    """
+    Default response class. Raw Mongo documents (ObjectId, datetime, Decimal)
+    can be returned directly as DocumentResponse(content), which skips
+    FastAPI's jsonable_encoder pass and encodes once in orjson.
+    """
+
+    def render(self, content):
+        return dumps(content)